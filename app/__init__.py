@@ -1,5 +1,10 @@
-from motor.motor_asyncio import AsyncIOMotorClient
-from sanic import Sanic, text, json
+import logging
+import orjson
+from datetime import datetime, timezone
+from pydantic import TypeAdapter, ValidationError
+from pymongo import AsyncMongoClient
+from sanic import Sanic, text
+from sanic.response import raw
 from sanic_ext import Extend, openapi
 import sys
 import os
@@ -8,9 +13,37 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config import MONGO_URL, MONGO_DB, SERVER_HOST, SERVER_PORT, DEBUG
+from app.services.db_service import DBService
+from app.services.etherscan_service import EtherscanService, create_session
+
+# Các tham số ngày tháng (query string hoặc JSON body) được middleware parse sẵn
+DATE_PARAMS = ("fromDate", "from_date", "toDate", "to_date",
+               "preCampaignStart", "preCampaignEnd", "campaignStart", "campaignEnd")
+_DATETIME_ADAPTER = TypeAdapter(datetime)
+
+def ojson(data, status=200):
+    """JSON response serialized with orjson (datetime/numpy values handled natively)"""
+    return raw(orjson.dumps(data, option=orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY),
+               status=status, content_type="application/json")
+
+def configure_logging() -> None:
+    """Configure root logging, unless handlers are already installed (reloader, embedding app)"""
+    if logging.getLogger().handlers:
+        return
+    logging.basicConfig(
+        level=logging.INFO if DEBUG else logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
 
 def create_app() -> Sanic:
-    app = Sanic("blockchain_metrics")
+    configure_logging()
+
+    # Sanic tự chạy trên uvloop khi đã cài đặt (không hỗ trợ Windows)
+    # Request bodies are decoded with orjson too (request.json)
+    app = Sanic("blockchain_metrics", loads=orjson.loads)
 
     # Cấu hình Sanic Extensions với OpenAPI
     app.config.API_TITLE = "Blockchain Metrics API"
@@ -29,10 +62,47 @@ def create_app() -> Sanic:
     # Initialize Sanic Extensions
     Extend(app)
 
+    @app.on_request
+    async def set_request_time(request):
+        # Sample the clock once per request so every "now" in a request is identical
+        request.ctx.now = datetime.now(tz=timezone.utc)
+
+    @app.on_request
+    async def parse_dates(request):
+        # Parse date parameters once per request, endpoints read request.ctx.dates.
+        # POST endpoints take dates from the JSON body only, GET endpoints from the query
+        # string only: the two sources are never mixed
+        request.ctx.dates = {}
+        if not request.path.startswith("/api/"):
+            return
+
+        if request.method == "POST":
+            try:
+                source = request.json
+            except Exception:
+                source = None  # Malformed body is reported by the endpoint itself
+            if not isinstance(source, dict):
+                return
+        else:
+            source = request.args
+
+        for key in DATE_PARAMS:
+            value = source.get(key)
+            if value is None:
+                continue
+
+            try:
+                request.ctx.dates[key] = _DATETIME_ADAPTER.validate_python(value)
+            except ValidationError:
+                return ojson({
+                    "success": False,
+                    "message": f"Invalid {key} format. Use ISO format (e.g. 2023-01-01T00:00:00Z)"
+                }, status=400)
+
     # Add a root route for API health check and redirect to docs
     @app.route("/")
     async def index(request):
-        return json({
+        return ojson({
             "status": "online",
             "api_name": "Blockchain Metrics API",
             "version": "1.0.0",
@@ -42,22 +112,31 @@ def create_app() -> Sanic:
     @app.listener('before_server_start')
     async def setup_db(app, loop):
         # Setup MongoDB connection
-        app.ctx.mongo_client = AsyncIOMotorClient(MONGO_URL)
+        # Một client duy nhất cho cả process, chạy trực tiếp trên event loop
+        app.ctx.mongo_client = AsyncMongoClient(MONGO_URL, maxPoolSize=50)
         app.ctx.db = app.ctx.mongo_client[MONGO_DB]
 
         # Create indexes for better performance
-        await app.ctx.db.token_metrics.create_index("campaign_id")
-        await app.ctx.db.campaign_reports.create_index("contract_address")
-        await app.ctx.db.campaign_reports.create_index([("last_updated", -1)])
+        await DBService(app.ctx.db).create_indexes()
 
         print(f"Connected to MongoDB at {MONGO_URL}")
 
+    @app.listener('before_server_start')
+    async def setup_etherscan(app, loop):
+        # Một HTTP session keep-alive dùng chung cho mọi request tới Etherscan
+        app.ctx.http = create_session()
+        app.ctx.etherscan = EtherscanService(session=app.ctx.http)
+
     @app.listener('after_server_stop')
     async def close_db(app, loop):
         # Close MongoDB connection
-        app.ctx.mongo_client.close()
+        await app.ctx.mongo_client.close()
         print("Closed MongoDB connection")
 
+    @app.listener('after_server_stop')
+    async def close_etherscan(app, loop):
+        await app.ctx.http.close()
+
     # Import and register blueprints
     from app.api.token_metrics import token_metrics_blueprint
     from app.api.etherscan import etherscan_blueprint
@@ -1,8 +1,14 @@
-from sanic import Blueprint, response
+import asyncio
+import logging
+import orjson
+from sanic import Blueprint
 from sanic.request import Request
-from datetime import datetime, timedelta
-from app.services.etherscan_service import EtherscanService
+from sanic.response import raw
+from app import ojson
+from app.utils.eth import valid_addr, invalid_address_response
+from datetime import datetime, timedelta, timezone
 from app.services.db_service import DBService
+from app.services.etherscan_service import BLOCK_FINALITY_SECONDS
 from pydantic import BaseModel, Field
 from sanic_ext import openapi
 from typing import Optional
@@ -10,21 +16,75 @@ from typing import Optional
 # Tạo Pydantic model cho request body
 class FetchMetricsRequest(BaseModel):
     contractAddress: str = Field(..., description="Ethereum contract address for the token")
-    fromDate: str = Field(None, description="Start date for metrics calculation (ISO format)")
-    toDate: str = Field(None, description="End date for metrics calculation (ISO format)")
+    fromDate: Optional[datetime] = Field(None, description="Start date for metrics calculation (ISO format)")
+    toDate: Optional[datetime] = Field(None, description="End date for metrics calculation (ISO format)")
     maxPages: int = Field(10, description="Maximum number of pages to fetch (0 for unlimited)")
     sortOrder: str = Field("desc", description="Sort order: 'asc' for oldest first, 'desc' for newest first (default)")
 
 # Model for campaign report requests
 class CampaignReportRequest(BaseModel):
     contractAddress: str = Field(..., description="Token contract address")
-    preCampaignStart: str = Field(..., description="Pre-campaign period start date (ISO format)")
-    preCampaignEnd: str = Field(..., description="Pre-campaign period end date (ISO format)")
-    campaignStart: str = Field(..., description="Campaign period start date (ISO format)")
-    campaignEnd: str = Field(..., description="Campaign period end date (ISO format)")
+    preCampaignStart: datetime = Field(..., description="Pre-campaign period start date (ISO format)")
+    preCampaignEnd: datetime = Field(..., description="Pre-campaign period end date (ISO format)")
+    campaignStart: datetime = Field(..., description="Campaign period start date (ISO format)")
+    campaignEnd: datetime = Field(..., description="Campaign period end date (ISO format)")
     maxPages: int = Field(10, description="Maximum pages per period (0 for unlimited)")
 
 etherscan_blueprint = Blueprint('etherscan', url_prefix='/api/etherscan')
+logger = logging.getLogger(__name__)
+
+# Body cố định của endpoint /fetch-metrics (đã ngừng hỗ trợ), serialize một lần khi import
+_DEPRECATED_RESPONSE = orjson.dumps({
+    "success": False,
+    "message": "This endpoint is deprecated. Please use /api/etherscan/campaign-report instead for advanced metrics."
+})
+
+# Số phần tử dailyData được serialize và gửi trong mỗi chunk
+_STREAM_BATCH_SIZE = 500
+
+def _as_utc(value: datetime) -> datetime:
+    """Timezone-aware UTC datetime; dates without an offset are read as UTC (like BSON Dates)"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def _report_head(report: dict, message: str) -> bytes:
+    """
+    Encode {"success": true, "message": ..., "data": {<every section but dailyData>,
+    up to the opening of dailyData, before anything is sent
+    """
+    parts = [b'{"success":true,"message":' + orjson.dumps(message) + b',"data":{']
+    for key, value in report.items():
+        if key != "dailyData":
+            parts.append(orjson.dumps(key) + b':' + orjson.dumps(value) + b',')
+    parts.append(b'"dailyData":{')
+    return b''.join(parts)
+
+async def _stream_report(request: Request, head: bytes, daily_data: dict) -> None:
+    """
+    Write the report as a chunked response: head (see _report_head), then each dailyData
+    series in batches of items serialized with orjson, so the whole payload is never held
+    in one buffer.
+
+    The 200 headers are already sent once streaming starts: an error here can only end the
+    (truncated) body, never send another response.
+    """
+    response = await request.respond(content_type="application/json")
+    try:
+        await response.send(head)
+        for index, (series, items) in enumerate(daily_data.items()):
+            await response.send((b',' if index else b'') + orjson.dumps(series) + b':[')
+            for start in range(0, len(items), _STREAM_BATCH_SIZE):
+                batch = b','.join(orjson.dumps(item) for item in items[start:start + _STREAM_BATCH_SIZE])
+                await response.send((b',' if start else b'') + batch)
+            await response.send(b']')
+        await response.send(b'}}}')
+    except Exception as e:
+        logger.warning(f"Campaign report stream aborted: {str(e)}")
+    try:
+        await response.eof()
+    except Exception:
+        pass  # Client already gone
 
 @etherscan_blueprint.route("/check-transactions/<contract_address:str>", methods=["GET"])
 @openapi.summary("Debug contract transactions")
@@ -41,24 +101,23 @@ async def check_transactions(request: Request, contract_address: str):
     """
     try:
         # Kiểm tra địa chỉ Ethereum
-        if not contract_address.startswith('0x') or len(contract_address) != 42:
-            return response.json({
-                "success": False,
-                "message": f"Invalid Ethereum address format: {contract_address}. Address must be in format 0x... and 42 characters long."
-            }, status=400)
+        if not valid_addr(contract_address):
+            return invalid_address_response(contract_address)
 
         # Get pagination parameters
         max_pages = int(request.args.get('max_pages', 3))  # Default 3 pages
         sort_order = request.args.get('sort_order', 'desc')  # Default newest first
 
-        etherscan_service = EtherscanService()
+        etherscan_service = request.app.ctx.etherscan
         # Get transactions from the last 365 days to check activity
-        from_date = datetime.now() - timedelta(days=365)
-        to_date = datetime.now()
+        to_date = request.ctx.now
+        from_date = to_date - timedelta(days=365)
 
         # Get block numbers for timestamp range
-        from_block = await etherscan_service.get_block_by_timestamp(int(from_date.timestamp()))
-        to_block = await etherscan_service.get_block_by_timestamp(int(to_date.timestamp()))
+        from_block, to_block = await asyncio.gather(
+            etherscan_service.get_block_by_timestamp(int(from_date.timestamp())),
+            etherscan_service.get_block_by_timestamp(int(to_date.timestamp()))
+        )
 
         transactions = await etherscan_service.get_token_transactions_by_blocks(
             contract_address,
@@ -70,20 +129,18 @@ async def check_transactions(request: Request, contract_address: str):
 
         token_info = await etherscan_service.get_token_info(contract_address)
 
-        # Get first few and last few transactions for debugging
-        sample_transactions = []
-        if len(transactions) > 0:
-            # Get up to 5 first and 5 last transactions
-            sample_size = min(5, len(transactions))
-            first_txs = transactions[:sample_size]
-            last_txs = transactions[-sample_size:] if len(transactions) > sample_size else []
-            sample_transactions = first_txs + (last_txs if last_txs != first_txs else [])
+        # Get first few and last few transactions for debugging (up to 5 first and 5 last)
+        if len(transactions) <= 10:
+            sample_transactions = transactions
+        else:
+            sample_transactions = transactions[:5] + transactions[-5:]
 
-        return response.json({
+        return ojson({
             "success": True,
             "data": {
                 "contractAddress": contract_address,
-                "tokenInfo": token_info,
+                # divisor (10 ** decimals) is internal and may exceed orjson's 64-bit integer range
+                "tokenInfo": {key: value for key, value in token_info.items() if key != "divisor"},
                 "transactionCount": len(transactions),
                 "blockRange": {
                     "fromBlock": from_block,
@@ -97,12 +154,12 @@ async def check_transactions(request: Request, contract_address: str):
                     "maxPages": max_pages,
                     "sortOrder": sort_order
                 },
-                "sampleTransactions": sample_transactions[:10]  # Limit to 10 samples
+                "sampleTransactions": sample_transactions
             }
         })
 
     except Exception as e:
-        return response.json({
+        return ojson({
             "success": False,
             "message": f"Error checking transactions: {str(e)}"
         }, status=500)
@@ -128,79 +185,83 @@ async def campaign_report(request: Request):
     try:
         # Validate request body
         if not request.json:
-            return response.json({
+            return ojson({
                 "success": False,
                 "message": "Request body is required"
             }, status=400)
 
+        # Dates were already parsed by the parse_dates middleware
         try:
-            body = CampaignReportRequest(**request.json)
+            body = CampaignReportRequest.model_validate({**request.json, **request.ctx.dates})
         except Exception as e:
-            return response.json({
+            return ojson({
                 "success": False,
                 "message": f"Invalid request data: {str(e)}"
             }, status=400)
 
         # Validate contract address
         contract_address = body.contractAddress
-        if not contract_address.startswith('0x') or len(contract_address) != 42:
-            return response.json({
-                "success": False,
-                "message": f"Invalid Ethereum address format: {contract_address}. Address must be in format 0x... and 42 characters long."
-            }, status=400)
+        if not valid_addr(contract_address):
+            return invalid_address_response(contract_address)
 
-        # Parse dates
-        try:
-            pre_start = datetime.fromisoformat(body.preCampaignStart.replace('Z', '+00:00'))
-            pre_end = datetime.fromisoformat(body.preCampaignEnd.replace('Z', '+00:00'))
-            campaign_start = datetime.fromisoformat(body.campaignStart.replace('Z', '+00:00'))
-            campaign_end = datetime.fromisoformat(body.campaignEnd.replace('Z', '+00:00'))
-        except ValueError as e:
-            return response.json({
-                "success": False,
-                "message": f"Invalid date format. Use ISO format (e.g. 2023-01-01T00:00:00Z): {str(e)}"
-            }, status=400)
+        # Normalized once, so comparisons never mix naive and aware datetimes and the report,
+        # its stored periods and its finality check all read dates without an offset the same way
+        pre_start = _as_utc(body.preCampaignStart)
+        pre_end = _as_utc(body.preCampaignEnd)
+        campaign_start = _as_utc(body.campaignStart)
+        campaign_end = _as_utc(body.campaignEnd)
 
         # Validate date ranges
         if pre_end <= pre_start:
-            return response.json({
+            return ojson({
                 "success": False,
                 "message": "Pre-campaign end date must be after start date"
             }, status=400)
 
         if campaign_end <= campaign_start:
-            return response.json({
+            return ojson({
                 "success": False,
                 "message": "Campaign end date must be after start date"
             }, status=400)
 
-        # Generate report
-        etherscan_service = EtherscanService()
-        report = await etherscan_service.generate_campaign_report(
-            contract_address,
-            pre_start,
-            pre_end,
-            campaign_start,
-            campaign_end,
-            max_pages=body.maxPages
-        )
-
-        # Store report in database if needed
         db_service = DBService(request.app.ctx.db)
-        await db_service.store_campaign_report(report)
 
-        return response.json({
-            "success": True,
-            "message": "Affiliate campaign report generated successfully",
-            "data": report
-        })
+        # A report generated after both periods were final never changes: serve the stored one
+        stored_report = await db_service.get_final_campaign_report(
+            contract_address, pre_start, pre_end, campaign_start, campaign_end, body.maxPages,
+            generated_after=max(pre_end, campaign_end) + timedelta(seconds=BLOCK_FINALITY_SECONDS))
+        if stored_report is not None:
+            report = stored_report
+            message = "Affiliate campaign report loaded from stored results"
+        else:
+            # Generate report
+            etherscan_service = request.app.ctx.etherscan
+            report = await etherscan_service.generate_campaign_report(
+                contract_address,
+                pre_start,
+                pre_end,
+                campaign_start,
+                campaign_end,
+                max_pages=body.maxPages,
+                db_service=db_service
+            )
+
+            # Store report in database if needed
+            await db_service.store_campaign_report(report)
+            message = "Affiliate campaign report generated successfully"
+
+        # Everything that can fail is done before the response starts
+        head = _report_head(report, message)
 
     except Exception as e:
-        return response.json({
+        return ojson({
             "success": False,
             "message": f"Error generating campaign report: {str(e)}"
         }, status=500)
 
+    # Stream the (possibly large) report instead of building one response buffer
+    await _stream_report(request, head, report.get("dailyData", {}))
+
 @etherscan_blueprint.route("/fetch-metrics", methods=["POST"])
 @openapi.summary("Fetch metrics from Etherscan")
 @openapi.description("Calculate token metrics from Etherscan data for a given contract address")
@@ -211,23 +272,11 @@ async def campaign_report(request: Request):
     "maxPages": 10,
     "sortOrder": "desc"
 })
-@openapi.response(200, {"success": True, "message": "Token metrics fetched successfully", "data": {}}, "Success")
-@openapi.response(400, {"success": False, "message": "Invalid parameters"}, "Invalid parameters")
-@openapi.response(500, {"success": False, "message": "Error fetching metrics"}, "Server error")
+@openapi.response(410, {"success": False, "message": "This endpoint is deprecated"}, "Endpoint removed")
 async def fetch_metrics(request: Request):
     """
     Fetch metrics from Etherscan for a token (Legacy endpoint)
 
     Note: For more comprehensive metrics, use the /campaign-report endpoint instead.
     """
-    try:
-        return response.json({
-            "success": False,
-            "message": "This endpoint is deprecated. Please use /api/etherscan/campaign-report instead for advanced metrics."
-        }, status=400)
-    except Exception as e:
-        return response.json({
-            "success": False,
-            "message": f"Error fetching metrics: {e}"
-        }, status=500)
-
+    return raw(_DEPRECATED_RESPONSE, status=410, content_type="application/json")
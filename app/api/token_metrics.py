@@ -1,6 +1,7 @@
-from sanic import Blueprint, response
+from sanic import Blueprint
 from sanic.request import Request
-from datetime import datetime
+from app import ojson
+from app.utils.eth import valid_addr, invalid_address_response
 from app.services.db_service import DBService
 from typing import Optional, Dict, Any
 from pydantic import BaseModel
@@ -30,51 +31,30 @@ async def get_campaign_metrics(request: Request, campaign_id: str):
     """
     try:
         # Check if address is valid Ethereum address
-        if not campaign_id.startswith('0x') or len(campaign_id) != 42:
-            return response.json({
-                "success": False,
-                "message": f"Invalid Ethereum address format: {campaign_id}. Address must be in format 0x... and 42 characters long."
-            }, status=400)
-
-        # Parse date parameters if provided
-        from_date = request.args.get('from_date')
-        to_date = request.args.get('to_date')
-
-        if from_date:
-            try:
-                from_date = datetime.fromisoformat(from_date.replace('Z', '+00:00'))
-            except ValueError:
-                return response.json({
-                    "success": False,
-                    "message": f"Invalid from_date format. Use ISO format (e.g. 2023-01-01T00:00:00Z)"
-                }, status=400)
+        if not valid_addr(campaign_id):
+            return invalid_address_response(campaign_id)
 
-        if to_date:
-            try:
-                to_date = datetime.fromisoformat(to_date.replace('Z', '+00:00'))
-            except ValueError:
-                return response.json({
-                    "success": False,
-                    "message": f"Invalid to_date format. Use ISO format (e.g. 2023-01-01T00:00:00Z)"
-                }, status=400)
+        # Date parameters are parsed and validated by the parse_dates middleware
+        from_date = request.ctx.dates.get('from_date')
+        to_date = request.ctx.dates.get('to_date')
 
         # Get metrics from database
         db_service = DBService(request.app.ctx.db)
         metrics = await db_service.get_metrics(campaign_id, from_date, to_date)
 
         if not metrics:
-            return response.json({
+            return ojson({
                 "success": False,
                 "message": f"No metrics found for campaign {campaign_id}. Try fetching metrics first via /api/etherscan/fetch-metrics"
             }, status=404)
 
-        return response.json({
+        return ojson({
             "success": True,
             "data": metrics
         })
 
     except Exception as e:
-        return response.json({
+        return ojson({
             "success": False,
             "message": f"Error retrieving metrics: {str(e)}"
         }, status=500)
@@ -0,0 +1,96 @@
+import asyncio
+import functools
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from cachetools import Cache
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+
+
+class AsyncCache:
+    """In-process cache for coroutines, backed by a cachetools cache"""
+
+    def __init__(self, cache: Cache):
+        self._cache = cache
+        self._lock = asyncio.Lock()
+        self.stats = CacheStats()
+
+    async def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Return (found, value) for the given key and update hit/miss stats"""
+        async with self._lock:
+            try:
+                value = self._cache[key]
+            except KeyError:
+                self.stats.misses += 1
+                return False, None
+            self.stats.hits += 1
+            return True, value
+
+    async def set(self, key: Hashable, value: Any) -> None:
+        async with self._lock:
+            self._cache[key] = value
+
+    async def setdefault(self, key: Hashable, value: Any) -> None:
+        """Store the value only if the key is not cached yet"""
+        async with self._lock:
+            if key not in self._cache:
+                self._cache[key] = value
+
+    async def evict(self, predicate: Callable[[Hashable], bool]) -> None:
+        """Drop every entry whose key matches the predicate"""
+        async with self._lock:
+            for key in [key for key in self._cache if predicate(key)]:
+                self._cache.pop(key, None)
+
+    async def clear(self) -> None:
+        async with self._lock:
+            self._cache.clear()
+
+
+def cached(cache: AsyncCache, key: Callable[..., Hashable],
+           unless: Optional[Callable[[Any], bool]] = None):
+    """
+    Memoize an async method in the given cache
+
+    Concurrent calls that miss on the same key wait for one shared call instead of
+    each running the method.
+
+    Args:
+        cache: Cache shared by every instance of the class
+        key: Builds the cache key from the call arguments (without self)
+        unless: Results for which this returns True are not cached (e.g. failures)
+    """
+    def decorator(func):
+        # Calls currently running per key, so concurrent misses on one key share a single call
+        pending: Dict[Hashable, asyncio.Future] = {}
+
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            cache_key = key(*args, **kwargs)
+            found, value = await cache.get(cache_key)
+            if found:
+                return value
+
+            task = pending.get(cache_key)
+            if task is not None:
+                return await asyncio.shield(task)
+
+            task = asyncio.ensure_future(func(self, *args, **kwargs))
+            pending[cache_key] = task
+            try:
+                value = await asyncio.shield(task)
+            finally:
+                pending.pop(cache_key, None)
+
+            if unless is None or not unless(value):
+                await cache.set(cache_key, value)
+            return value
+
+        return wrapper
+
+    return decorator
@@ -1,175 +1,327 @@
-from typing import Dict, List, Optional
-from datetime import datetime
-from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import AsyncGenerator, Callable, Dict, List, Optional, Set, Tuple, Union
+from datetime import datetime, timezone
+from cachetools import TTLCache
+from pymongo import ReadPreference, UpdateOne
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.asynchronous.database import AsyncDatabase
+
+from app.services.cache import AsyncCache, cached
+
+# Short-lived caches for dashboard polling; store_* methods evict the keys they change
+METRICS_CACHE = AsyncCache(TTLCache(maxsize=256, ttl=30))
+CAMPAIGN_REPORT_CACHE = AsyncCache(TTLCache(maxsize=256, ttl=30))
+
+# Server-side time limit for every read, so a bad plan fails fast instead of scanning
+QUERY_MAX_TIME_MS = 2000
+
+
+# $project stage renaming token_metrics documents to the camelCase API shape.
+# Built once at import instead of on every get_metrics call.
+_METRICS_API_PROJECTION = {
+    "_id": 0,
+    "campaignId": "$campaign_id",
+    "timeWindow": "$time_window",
+    "metrics": {
+        "activeWallets": "$metrics.active_wallets",
+        "transactionVolume": "$metrics.transaction_volume",
+        "newTokenHolders": "$metrics.new_token_holders"
+    },
+    "lastUpdated": "$last_updated",
+    # Add dataCollection only if present
+    "dataCollection": {
+        "$cond": [
+            {"$ifNull": ["$data_collection", False]},
+            {
+                "maxPages": {"$ifNull": ["$data_collection.max_pages", 0]},
+                "sortOrder": {"$ifNull": ["$data_collection.sort_order", "asc"]},
+                "transactionsFound": {"$ifNull": ["$data_collection.transactions_found", 0]}
+            },
+            "$$REMOVE"
+        ]
+    }
+}
+
+
+def _to_datetime(value: Union[str, datetime]) -> datetime:
+    """Parse an ISO string (with optional 'Z' suffix) into a datetime"""
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def _campaign_report_cache_key(contract_address: str,
+                               pre_start: Optional[datetime] = None,
+                               pre_end: Optional[datetime] = None,
+                               campaign_start: Optional[datetime] = None,
+                               campaign_end: Optional[datetime] = None,
+                               projection: Optional[Dict] = None) -> Tuple:
+    """Hashable cache key for get_campaign_report arguments"""
+    return (contract_address, pre_start, pre_end, campaign_start, campaign_end,
+            tuple(sorted(projection.items())) if projection else None)
 
 
 class DBService:
-    def __init__(self, db: AsyncIOMotorDatabase):
+    def __init__(self, db: AsyncDatabase):
         self.db = db
+        # Primary handles for writes
         self.collection = db.token_metrics
         self.campaign_reports = db.campaign_reports
+        self.historical_holders = db.historical_holders
+        # Read handles: dashboard reads tolerate slight staleness, so let secondaries serve them
+        self.collection_r = self.collection.with_options(
+            read_preference=ReadPreference.SECONDARY_PREFERRED)
+        self.campaign_reports_r = self.campaign_reports.with_options(
+            read_preference=ReadPreference.SECONDARY_PREFERRED)
+
+    async def create_indexes(self) -> None:
+        """
+        Create the compound indexes backing every query in this service
+
+        Equality fields come first, then the sort field, then range fields (ESR rule).
+        """
+        # store_metrics upsert filter and get_metrics range scan
+        await self.collection.create_index(
+            [("campaign_id", 1), ("time_window.from", 1), ("time_window.to", 1)],
+            name="campaign_tw")
+        # get_campaign_report: equality on contract, sort by last_updated, range on periods
+        await self.campaign_reports.create_index(
+            [("contract_address", 1), ("last_updated", -1)],
+            name="addr_updated")
+        # store_campaign_report upsert filter (equality on contract and all period bounds;
+        # max_pages is only filtered on the few reports of those periods)
+        await self.campaign_reports.create_index(
+            [("contract_address", 1), ("pre_period.from", 1), ("pre_period.to", 1),
+             ("campaign_period.from", 1), ("campaign_period.to", 1), ("last_updated", -1)],
+            name="addr_periods")
+        # get/store_historical_holders: one document per contract and block range
+        await self.historical_holders.create_index(
+            [("contract_address", 1), ("from_block", 1), ("to_block", 1)],
+            name="addr_blocks", unique=True)
+
+    async def store_metrics(self, metrics: Dict) -> Optional[str]:
+        """Store token metrics in MongoDB (single atomic upsert)"""
+        return (await self.store_metrics_bulk([metrics]))[0]
+
+    async def store_metrics_bulk(self, metrics_list: List[Dict]) -> List[Optional[str]]:
+        """
+        Store many token metrics documents in one bulk_write round trip
+
+        Args:
+            metrics_list: Token metrics in the camelCase API format
 
-    async def store_metrics(self, metrics: Dict) -> str:
-        """Store token metrics in MongoDB"""
+        Returns:
+            For each input, the ID of the new record, or None if an existing one was updated
+        """
+        return await self._bulk_upsert(
+            self.collection, metrics_list, self._metrics_upsert,
+            METRICS_CACHE, {metrics["campaignId"] for metrics in metrics_list})
+
+    @staticmethod
+    async def _bulk_upsert(collection: AsyncCollection, docs: List[Dict],
+                           build_op: Callable[[Dict, datetime], UpdateOne],
+                           cache: AsyncCache, cache_keys: Set[str]) -> List[Optional[str]]:
+        """
+        Upsert documents in one unordered bulk_write and evict their cached reads
+
+        Args:
+            collection: Target collection
+            docs: Documents in the API format
+            build_op: Builds the UpdateOne for one document and the batch timestamp
+            cache: Read cache for this collection
+            cache_keys: Values of the first cache key component touched by this batch
+
+        Returns:
+            For each input, the ID of the new record, or None if an existing one was updated
+        """
+        if not docs:
+            return []
+
+        # One clock read per batch, shared by every document in it
+        now = datetime.now(tz=timezone.utc)
+        result = await collection.bulk_write([build_op(doc, now) for doc in docs], ordered=False)
+        await cache.evict(lambda key: key[0] in cache_keys)
+        return [str(result.upserted_ids[i]) if i in result.upserted_ids else None
+                for i in range(len(docs))]
+
+    @staticmethod
+    def _metrics_upsert(metrics: Dict, now: datetime) -> UpdateOne:
+        """Build the upsert operation for one token metrics document"""
         campaign_id = metrics["campaignId"]
-        time_window = metrics["timeWindow"]
+        # Store the window bounds as BSON Date, not ISO strings
+        time_window = {
+            "from": _to_datetime(metrics["timeWindow"]["from"]),
+            "to": _to_datetime(metrics["timeWindow"]["to"])
+        }
 
-        # Check if a record already exists for this campaign and time window
-        existing = await self.collection.find_one({
+        # Lookup key for this campaign and time window
+        query = {
             "campaign_id": campaign_id,
             "time_window.from": time_window["from"],
             "time_window.to": time_window["to"]
-        })
+        }
+
+        # Convert to snake_case for MongoDB
+        update_fields = {
+            "metrics": {
+                "active_wallets": metrics["metrics"]["activeWallets"],
+                "transaction_volume": metrics["metrics"]["transactionVolume"],
+                "new_token_holders": metrics["metrics"]["newTokenHolders"]
+            },
+            "last_updated": metrics["lastUpdated"]
+        }
 
         # Handle the optional dataCollection field
         data_collection = metrics.get("dataCollection", {})
-
-        if existing:
-            # Update existing record
-            update_fields = {
-                "metrics": metrics["metrics"],
-                "last_updated": metrics["lastUpdated"]
-            }
-
-            # Add dataCollection if present
-            if data_collection:
-                update_fields["data_collection"] = {
-                    "max_pages": data_collection.get("maxPages", 0),
-                    "sort_order": data_collection.get("sortOrder", "asc"),
-                    "transactions_found": data_collection.get("transactionsFound", 0)
-                }
-
-            result = await self.collection.update_one(
-                {"_id": existing["_id"]},
-                {"$set": update_fields}
-            )
-            return str(existing["_id"])
-        else:
-            # Create new record
-            # Convert to snake_case for MongoDB
-            db_record = {
-                "campaign_id": campaign_id,
-                "time_window": {
-                    "from": time_window["from"],
-                    "to": time_window["to"]
-                },
-                "metrics": {
-                    "active_wallets": metrics["metrics"]["activeWallets"],
-                    "transaction_volume": metrics["metrics"]["transactionVolume"],
-                    "new_token_holders": metrics["metrics"]["newTokenHolders"]
-                },
-                "last_updated": metrics["lastUpdated"]
+        if data_collection:
+            update_fields["data_collection"] = {
+                "max_pages": data_collection.get("maxPages", 0),
+                "sort_order": data_collection.get("sortOrder", "asc"),
+                "transactions_found": data_collection.get("transactionsFound", 0)
             }
 
-            # Add dataCollection if present
-            if data_collection:
-                db_record["data_collection"] = {
-                    "max_pages": data_collection.get("maxPages", 0),
-                    "sort_order": data_collection.get("sortOrder", "asc"),
-                    "transactions_found": data_collection.get("transactionsFound", 0)
+        return UpdateOne(
+            query,
+            {
+                "$set": update_fields,
+                "$setOnInsert": {
+                    "campaign_id": campaign_id,
+                    "time_window": {
+                        "from": time_window["from"],
+                        "to": time_window["to"]
+                    },
+                    "created_at": now
                 }
+            },
+            upsert=True
+        )
 
-            result = await self.collection.insert_one(db_record)
-            return str(result.inserted_id)
-
+    @cached(METRICS_CACHE,
+            key=lambda campaign_id, from_date=None, to_date=None: (campaign_id, from_date, to_date))
     async def get_metrics(self, campaign_id: str, from_date: Optional[datetime] = None,
                          to_date: Optional[datetime] = None) -> List[Dict]:
         """Get metrics for a campaign with optional time filtering"""
-        query = {"campaign_id": campaign_id}
-
-        if from_date or to_date:
-            query["time_window"] = {}
-            if from_date:
-                query["time_window"]["from"] = {"$gte": from_date.isoformat()}
-            if to_date:
-                query["time_window"]["to"] = {"$lte": to_date.isoformat()}
+        return [metric async for metric in self.iter_metrics(campaign_id, from_date, to_date)]
 
-        cursor = self.collection.find(query)
-        metrics = []
+    async def iter_metrics(self, campaign_id: str, from_date: Optional[datetime] = None,
+                           to_date: Optional[datetime] = None) -> AsyncGenerator[Dict, None]:
+        """Stream metrics for a campaign, one document at a time, in server-side batches of 500"""
+        query = {"campaign_id": campaign_id}
 
+        # Dotted keys + native datetime (BSON Date) so the campaign_tw index serves the range
+        if from_date:
+            query["time_window.from"] = {"$gte": from_date}
+        if to_date:
+            query["time_window.to"] = {"$lte": to_date}
+
+        # Reshape to the camelCase API format on the server, no per-document Python loop
+        pipeline = [
+            {"$match": query},
+            {"$sort": {"time_window.from": 1}},
+            {"$project": _METRICS_API_PROJECTION}
+        ]
+
+        cursor = await self.collection_r.aggregate(pipeline, hint="campaign_tw", batchSize=500,
+                                                   maxTimeMS=QUERY_MAX_TIME_MS)
         async for doc in cursor:
-            # Convert to camelCase for API response
-            metric_response = {
-                "campaignId": doc["campaign_id"],
-                "timeWindow": {
-                    "from": doc["time_window"]["from"],
-                    "to": doc["time_window"]["to"]
-                },
-                "metrics": {
-                    "activeWallets": doc["metrics"]["active_wallets"],
-                    "transactionVolume": doc["metrics"]["transaction_volume"],
-                    "newTokenHolders": doc["metrics"]["new_token_holders"]
-                },
-                "lastUpdated": doc["last_updated"]
-            }
+            yield doc
 
-            # Add dataCollection if present
-            if "data_collection" in doc:
-                metric_response["dataCollection"] = {
-                    "maxPages": doc["data_collection"].get("max_pages", 0),
-                    "sortOrder": doc["data_collection"].get("sort_order", "asc"),
-                    "transactionsFound": doc["data_collection"].get("transactions_found", 0)
-                }
+    async def store_campaign_report(self, report: Dict) -> Optional[str]:
+        """
+        Store campaign report in MongoDB
 
-            metrics.append(metric_response)
+        Args:
+            report: Complete campaign report generated by EtherscanService
 
-        return metrics
+        Returns:
+            ID of the stored report if a new record was created, None if an existing one was updated
+        """
+        return (await self.store_campaign_reports_bulk([report]))[0]
 
-    async def store_campaign_report(self, report: Dict) -> str:
+    async def store_campaign_reports_bulk(self, reports: List[Dict]) -> List[Optional[str]]:
         """
-        Store campaign report in MongoDB
+        Store many campaign reports in one bulk_write round trip
 
         Args:
-            report: Complete campaign report generated by EtherscanService
+            reports: Complete campaign reports generated by EtherscanService
 
         Returns:
-            ID of the stored report
+            For each input, the ID of the new record, or None if an existing one was updated
         """
+        return await self._bulk_upsert(
+            self.campaign_reports, reports, self._campaign_report_upsert,
+            CAMPAIGN_REPORT_CACHE,
+            {report.get("campaign", {}).get("token", {}).get("contractAddress") for report in reports})
+
+    @staticmethod
+    def _campaign_report_upsert(report: Dict, now: datetime) -> UpdateOne:
+        """Build the upsert operation for one campaign report (usable in a bulk_write batch)"""
         contract_address = report.get("campaign", {}).get("token", {}).get("contractAddress")
         if not contract_address:
             raise ValueError("Report must contain a valid contract address")
 
-        # Format periods for querying later
-        pre_period = report.get("campaign", {}).get("period", {}).get("preCampaign", {})
-        campaign_period = report.get("campaign", {}).get("period", {}).get("duringCampaign", {})
+        # Format periods for querying later, as BSON Date (not ISO strings) so the
+        # addr_periods index is compact and range filters compare dates natively
+        periods = report.get("campaign", {}).get("period", {})
+        pre_period = {key: _to_datetime(value) for key, value in periods.get("preCampaign", {}).items()}
+        campaign_period = {key: _to_datetime(value) for key, value in periods.get("duringCampaign", {}).items()}
 
-        # Check if report already exists for this contract and time periods
+        # One report per contract, time periods and maxPages (reports with another page limit
+        # hold different data and must not overwrite each other)
+        max_pages = report.get("dataCollection", {}).get("maxPages")
         query = {
             "contract_address": contract_address,
             "pre_period.from": pre_period.get("from"),
             "pre_period.to": pre_period.get("to"),
             "campaign_period.from": campaign_period.get("from"),
-            "campaign_period.to": campaign_period.get("to")
+            "campaign_period.to": campaign_period.get("to"),
+            "max_pages": max_pages
         }
 
-        existing = await self.campaign_reports.find_one(query)
-
         # Format report for MongoDB (keep as is - no camelCase/snake_case conversion needed)
         db_record = {
             "contract_address": contract_address,
             "pre_period": pre_period,
             "campaign_period": campaign_period,
+            "max_pages": max_pages,
             "report": report,
-            "last_updated": datetime.now().isoformat()
+            "last_updated": now
         }
 
-        if existing:
-            # Update existing record
-            result = await self.campaign_reports.update_one(
-                {"_id": existing["_id"]},
-                {"$set": db_record}
-            )
-            return str(existing["_id"])
-        else:
-            # Create new record
-            result = await self.campaign_reports.insert_one(db_record)
-            return str(result.inserted_id)
+        return UpdateOne(
+            query,
+            {"$set": db_record, "$setOnInsert": {"created_at": db_record["last_updated"]}},
+            upsert=True
+        )
+
+    @staticmethod
+    def _campaign_report_query(contract_address: str,
+                               pre_start: Optional[datetime] = None,
+                               pre_end: Optional[datetime] = None,
+                               campaign_start: Optional[datetime] = None,
+                               campaign_end: Optional[datetime] = None) -> Dict:
+        """Build the campaign_reports filter for a contract with optional period bounds"""
+        query = {"contract_address": contract_address}
 
+        # Add date filters if provided (periods are stored as BSON Date)
+        if pre_start:
+            query["pre_period.from"] = {"$gte": pre_start}
+        if pre_end:
+            query["pre_period.to"] = {"$lte": pre_end}
+        if campaign_start:
+            query["campaign_period.from"] = {"$gte": campaign_start}
+        if campaign_end:
+            query["campaign_period.to"] = {"$lte": campaign_end}
+
+        return query
+
+    @cached(CAMPAIGN_REPORT_CACHE, key=_campaign_report_cache_key,
+            unless=lambda report: report is None)
     async def get_campaign_report(self, contract_address: str,
                                 pre_start: Optional[datetime] = None,
                                 pre_end: Optional[datetime] = None,
                                 campaign_start: Optional[datetime] = None,
-                                campaign_end: Optional[datetime] = None) -> Optional[Dict]:
+                                campaign_end: Optional[datetime] = None,
+                                projection: Optional[Dict] = None) -> Optional[Dict]:
         """
         Retrieve campaign report from MongoDB with optional time filtering
 
@@ -179,29 +331,118 @@ class DBService:
             pre_end: Pre-campaign end time for filtering
             campaign_start: Campaign start time for filtering
             campaign_end: Campaign end time for filtering
+            projection: Report fields to fetch, e.g. {"report.campaign": 1}
+                (defaults to the whole report)
 
         Returns:
-            Campaign report if found, None otherwise
+            Campaign report (or the projected part of it) if found, None otherwise
         """
-        query = {"contract_address": contract_address}
-
-        # Add date filters if provided
-        if pre_start:
-            query["pre_period.from"] = {"$gte": pre_start.isoformat()}
-        if pre_end:
-            query["pre_period.to"] = {"$lte": pre_end.isoformat()}
-        if campaign_start:
-            query["campaign_period.from"] = {"$gte": campaign_start.isoformat()}
-        if campaign_end:
-            query["campaign_period.to"] = {"$lte": campaign_end.isoformat()}
+        query = self._campaign_report_query(contract_address, pre_start, pre_end,
+                                            campaign_start, campaign_end)
 
         # Sort by last_updated to get most recent report first
-        report_doc = await self.campaign_reports.find_one(
+        report_doc = await self.campaign_reports_r.find_one(
             query,
-            sort=[("last_updated", -1)]
+            {"_id": 0, **(projection or {"report": 1})},
+            sort=[("last_updated", -1)],
+            # Pin the (contract_address, last_updated) index: equality + sort, no in-memory sort
+            hint="addr_updated",
+            max_time_ms=QUERY_MAX_TIME_MS
         )
 
         if report_doc:
-            return report_doc["report"]
+            return report_doc.get("report", {})
 
         return None
+
+    async def get_final_campaign_report(self, contract_address: str,
+                                        pre_start: datetime, pre_end: datetime,
+                                        campaign_start: datetime, campaign_end: datetime,
+                                        max_pages: int, generated_after: datetime) -> Optional[Dict]:
+        """
+        Get a stored report for exactly these periods that can be served instead of regenerating it
+
+        A report generated once its periods were final never changes, so only reports flagged
+        final by EtherscanService (periods over, no failed lookup or defaulted input) and stored
+        after generated_after (the periods' end plus the block finality delay) are returned.
+
+        Args:
+            contract_address: Token contract address
+            pre_start: Pre-campaign start time
+            pre_end: Pre-campaign end time
+            campaign_start: Campaign start time
+            campaign_end: Campaign end time
+            max_pages: maxPages the report was generated with
+            generated_after: Oldest report generation time that is still valid
+
+        Returns:
+            Campaign report if a final one is stored, None otherwise
+        """
+        # Equality on contract and all period bounds: served by the addr_periods index
+        # (matching the store_campaign_report upsert filter)
+        report_doc = await self.campaign_reports_r.find_one(
+            {
+                "contract_address": contract_address,
+                "pre_period.from": pre_start,
+                "pre_period.to": pre_end,
+                "campaign_period.from": campaign_start,
+                "campaign_period.to": campaign_end,
+                "max_pages": max_pages,
+                "last_updated": {"$gt": generated_after},
+                "report.dataCollection.final": True
+            },
+            {"_id": 0, "report": 1},
+            hint="addr_periods",
+            max_time_ms=QUERY_MAX_TIME_MS
+        )
+        return report_doc["report"] if report_doc else None
+
+    async def campaign_report_exists(self, contract_address: str,
+                                     pre_start: Optional[datetime] = None,
+                                     pre_end: Optional[datetime] = None,
+                                     campaign_start: Optional[datetime] = None,
+                                     campaign_end: Optional[datetime] = None) -> bool:
+        """Check whether a matching campaign report exists without fetching the report body"""
+        query = self._campaign_report_query(contract_address, pre_start, pre_end,
+                                            campaign_start, campaign_end)
+        return await self.campaign_reports_r.find_one(
+            query, {"_id": 1}, hint="addr_updated", max_time_ms=QUERY_MAX_TIME_MS) is not None
+
+    async def get_historical_holders(self, contract_address: str,
+                                     from_block: int, to_block: int) -> Optional[List[bytes]]:
+        """
+        Get the cached holder addresses of a token for a block range
+
+        Args:
+            contract_address: Token contract address
+            from_block: First block of the range
+            to_block: Last block of the range
+
+        Returns:
+            List of 20-byte holder addresses if the range was cached, None otherwise
+        """
+        doc = await self.historical_holders.find_one(
+            {"contract_address": contract_address.lower(), "from_block": from_block, "to_block": to_block},
+            {"_id": 0, "holders": 1},
+            hint="addr_blocks",
+            max_time_ms=QUERY_MAX_TIME_MS
+        )
+        return doc["holders"] if doc else None
+
+    async def store_historical_holders(self, contract_address: str, from_block: int,
+                                       to_block: int, holders: List[bytes]) -> None:
+        """
+        Cache the holder addresses of a token for a (finalized) block range
+
+        Args:
+            contract_address: Token contract address
+            from_block: First block of the range
+            to_block: Last block of the range
+            holders: 20-byte holder addresses found in the range (stored as BSON binary)
+        """
+        query = {"contract_address": contract_address.lower(), "from_block": from_block, "to_block": to_block}
+        await self.historical_holders.update_one(
+            query,
+            {"$set": {"holders": holders, "last_updated": datetime.now(tz=timezone.utc)}},
+            upsert=True
+        )
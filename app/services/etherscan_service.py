@@ -1,19 +1,107 @@
 import aiohttp
 import asyncio
-from datetime import datetime, timedelta, date
-from typing import Dict, List, Optional, Any, Tuple, Set
+import orjson
+from datetime import datetime, timedelta, timezone, date
+from typing import Dict, Iterable, List, Optional, Any, Tuple, Set
 import logging
-from collections import defaultdict
+from collections import deque
+import itertools
+import bisect
 
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from config import ETHERSCAN_API_KEY, ETHERSCAN_API_URL
+import math
+import time
+import numpy as np
+from aiolimiter import AsyncLimiter
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+from cachetools import LRUCache, TLRUCache, TTLCache
+
+from config import (ETHERSCAN_API_KEY, ETHERSCAN_API_URL, ETHERSCAN_CHAIN_ID,
+                    ETHERSCAN_MAX_CONCURRENCY, ETHERSCAN_RATE_LIMIT, TOKEN_INFO_CACHE_TTL,
+                    SERVER_WORKERS)
+from app.services.cache import AsyncCache, cached
+from app.services.db_service import DBService
+
+# Max records Etherscan returns for one query across all pages
+PAGINATION_WINDOW = 10_000
+# Pages requested ahead of the one being consumed (a page past the end is a wasted request)
+PAGE_WINDOW = 5
+# Etherscan's default endblock, i.e. "up to the latest block"
+LATEST_BLOCK = 99999999
+# Block time (seconds): how long a recent timestamp's block stays cached
+BLOCK_TIME = 12
+# Timestamps older than this are final: their block number can no longer change
+BLOCK_FINALITY_SECONDS = 120
+# Largest block range sampled for holders that existed before the pre-campaign period
+HISTORICAL_WINDOW_BLOCKS = 1_000_000
+# Pre-campaign and campaign periods at most this many blocks apart (~1 day) are fetched together
+COMBINED_FETCH_MAX_GAP_BLOCKS = 7_200
+# Transfer fields read by generate_campaign_report (tokentx rows carry about 20)
+REPORT_TX_FIELDS = ('blockNumber', 'timeStamp', 'from', 'to', 'value')
+# keccak256("Transfer(address,address,uint256)"), topic0 of ERC-20 Transfer events
+TRANSFER_TOPIC = '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'
+# Most logs Etherscan returns for one getLogs request
+LOGS_PAGE_SIZE = 1000
+# Daily series are bucketed by UTC day
+SECONDS_PER_DAY = 86_400
+# Day bucket 0 (timestamp // SECONDS_PER_DAY) is this UTC date
+EPOCH_DATE = date(1970, 1, 1)
+
+
+def _block_cache_ttu(key, block_number, now):
+    """Historical timestamps never expire, recent ones live for about one block"""
+    _, timestamp = key
+    if timestamp < now - BLOCK_FINALITY_SECONDS:
+        return math.inf
+    return now + BLOCK_TIME
+
+
+def address_bytes(address: str) -> bytes:
+    """20-byte form of a 0x-prefixed hex address (half the memory, cheaper to hash in sets)"""
+    return bytes.fromhex(address[2:])
+
+
+# Số request Etherscan đang chạy đồng thời tối đa trong process (page, block, token info)
+ETHERSCAN_SLOTS = asyncio.Semaphore(ETHERSCAN_MAX_CONCURRENCY)
+# Token bucket: ETHERSCAN_RATE_LIMIT is the API key's limit, shared by every worker process,
+# so each process paces its own share (below 1 req/s: one request per 1/share seconds)
+_RATE_SHARE = ETHERSCAN_RATE_LIMIT / max(1, SERVER_WORKERS)
+ETHERSCAN_RATE = AsyncLimiter(max(1.0, _RATE_SHARE), time_period=max(1.0, _RATE_SHARE) / _RATE_SHARE)
+
+
+# Cache dùng chung cho mọi instance EtherscanService (block/token info không đổi theo thời gian)
+BLOCK_CACHE = AsyncCache(TLRUCache(maxsize=10_000, ttu=_block_cache_ttu, timer=time.time))
+# Symbol/name/decimals của một ERC-20 không đổi: mặc định không hết hạn, TTL cấu hình được
+TOKEN_INFO_CACHE = AsyncCache(
+    TTLCache(maxsize=10_000, ttl=TOKEN_INFO_CACHE_TTL) if TOKEN_INFO_CACHE_TTL else LRUCache(maxsize=10_000))
+
+
+def create_session() -> aiohttp.ClientSession:
+    """
+    Create the keep-alive HTTP session used for Etherscan
+
+    One session per process (or per service when none is injected) so connections and
+    TLS sessions are reused across every page, block and token info request.
+    """
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=100, limit_per_host=20, ttl_dns_cache=300, keepalive_timeout=60),
+        timeout=aiohttp.ClientTimeout(total=30)
+    )
+
+
+class _RateLimit(Exception):
+    """Etherscan rate limit or transient HTTP error (429/5xx): the request can be retried"""
 
 
 class EtherscanService:
-    def __init__(self):
+    def __init__(self, session: Optional[aiohttp.ClientSession] = None):
+        # HTTP session dùng chung (keep-alive) do app tạo và đóng;
+        # nếu không truyền vào, service tự tạo khi cần và đóng trong aclose()
+        self.session = session
+        self._owns_session = False
         self.api_key = ETHERSCAN_API_KEY
         self.api_url = ETHERSCAN_API_URL
         self.logger = logging.getLogger(__name__)
@@ -23,6 +111,54 @@ class EtherscanService:
             logging.warning("ETHERSCAN_API_KEY không được cấu hình hoặc không hợp lệ")
             print("CẢNH BÁO: ETHERSCAN_API_KEY không được cấu hình. Đăng ký API key tại https://etherscan.io/apis")
 
+    async def _ensure_session(self) -> aiohttp.ClientSession:
+        """Return the HTTP session, creating a private one if none was injected"""
+        if self.session is None:
+            self.session = create_session()
+            self._owns_session = True
+        return self.session
+
+    async def aclose(self) -> None:
+        """Close the HTTP session if this service created it"""
+        if self._owns_session and self.session is not None:
+            await self.session.close()
+            self.session = None
+            self._owns_session = False
+
+    # Rate limits and transient HTTP errors are retried with exponential backoff, at most 5 attempts
+    @retry(wait=wait_exponential(multiplier=0.2, max=5), stop=stop_after_attempt(5),
+           retry=retry_if_exception_type(_RateLimit), reraise=True)
+    async def _get_json(self, params: Dict) -> Dict:
+        """
+        GET the Etherscan API and decode the JSON body
+
+        Every request holds a concurrency slot and a rate limiter token for the HTTP exchange.
+
+        Raises:
+            _RateLimit: Rate limit or transient (429/5xx) error, after all retries
+            Exception: Any other HTTP error
+        """
+        session = await self._ensure_session()
+        # Slot first, then the rate token: requests queued for a slot must not hold tokens
+        # and then fire in a burst when slots free up
+        async with ETHERSCAN_SLOTS, ETHERSCAN_RATE, session.get(self.api_url, params=params) as response:
+            if response.status == 429 or response.status >= 500:
+                raise _RateLimit(f"HTTP error {response.status}: {response.reason}")
+            if response.status != 200:
+                raise Exception(f"HTTP error {response.status}: {response.reason}")
+
+            data = orjson.loads(await response.read())
+
+        if data.get('status') != '1' and 'rate limit' in str(data.get('result', '')).lower():
+            self.logger.warning(f"Rate limit reached, retrying {params.get('action')} request")
+            raise _RateLimit(f"Etherscan rate limit: {data.get('result')}")
+        return data
+
+    # Failures (0) are not cached.
+    # Keyed on the exact timestamp: slots are not aligned to BLOCK_TIME buckets (and slots can
+    # be missed), so two timestamps in one bucket may have different "closest before" blocks
+    @cached(BLOCK_CACHE, key=lambda timestamp: (ETHERSCAN_CHAIN_ID, int(timestamp)),
+            unless=lambda block: block == 0)
     async def get_block_by_timestamp(self, timestamp: int) -> int:
         """
         Get the nearest block number for a given timestamp using Etherscan API
@@ -33,7 +169,7 @@ class EtherscanService:
         Returns:
             Block number
         """
-        self.logger.info(f"Getting block number for timestamp: {timestamp} ({datetime.fromtimestamp(timestamp).isoformat()})")
+        self.logger.info(f"Getting block number for timestamp: {timestamp} ({datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()})")
 
         params = {
             'module': 'block',
@@ -44,12 +180,7 @@ class EtherscanService:
         }
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(self.api_url, params=params) as response:
-                    if response.status != 200:
-                        raise Exception(f"HTTP error {response.status}: {response.reason}")
-
-                    data = await response.json()
+            data = await self._get_json(params)
 
             if data.get('status') != '1':
                 error_msg = data.get('message', 'Unknown error')
@@ -70,7 +201,9 @@ class EtherscanService:
                                               from_block: int, to_block: int,
                                               max_pages: int = 10,
                                               sort_order: str = "desc",
-                                              page_size: int = 1000) -> List[Dict]:
+                                              page_size: int = 1000,
+                                              fields: Optional[Tuple[str, ...]] = None,
+                                              errors: Optional[List[str]] = None) -> List[Dict]:
         """
         Fetch token transactions using block numbers with pagination support
 
@@ -81,6 +214,9 @@ class EtherscanService:
             max_pages: Maximum number of pages to fetch (0 for unlimited)
             sort_order: "asc" for oldest first or "desc" for newest first (default)
             page_size: Number of transactions per page (max 1000)
+            fields: Transaction fields to keep (all fields if None)
+            errors: If given, collects the Etherscan errors of pages that were treated as the
+                end of the results (the returned list is then incomplete)
 
         Returns:
             List of transactions matching the criteria
@@ -97,103 +233,53 @@ class EtherscanService:
         if page_size > 1000:
             page_size = 1000  # Etherscan max limit
 
-        all_transactions = []
-        current_page = 1
-        has_more_data = True
+        # get_block_by_timestamp returns 0 on failure: an end block of 0 would silently
+        # return nothing, so fall back to Etherscan's open-ended range instead
+        if not to_block:
+            self.logger.warning(f"End block unknown, falling back to latest block ({LATEST_BLOCK})")
+            to_block = LATEST_BLOCK
 
-        # Loop through pages until no more data or max_pages reached
-        while has_more_data and (max_pages == 0 or current_page <= max_pages):
-            self.logger.info(f"Fetching page {current_page}...")
-
-            params = {
-                'module': 'account',
-                'action': 'tokentx',
-                'contractaddress': contract_address,
-                'startblock': str(from_block),
-                'endblock': str(to_block),
-                'page': str(current_page),
-                'offset': str(page_size),
-                'sort': sort_order,
-                'apikey': self.api_key
-            }
+        # Etherscan only serves the first 10,000 records of a query (page * offset <= 10000)
+        last_page = PAGINATION_WINDOW // page_size
+        if max_pages:
+            last_page = min(last_page, max_pages)
 
-            try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(self.api_url, params=params) as response:
-                        if response.status != 200:
-                            raise Exception(f"HTTP error {response.status}: {response.reason}")
-
-                        data = await response.json()
-
-                self.logger.info(f"Page {current_page} - Etherscan API response: Status={data.get('status')}, Message={data.get('message')}")
-
-                if data.get('status') != '1':
-                    error_msg = data.get('message', 'Unknown error')
-                    result = data.get('result', '')
-
-                    if error_msg == 'NOTOK' and 'API Key' in result:
-                        raise Exception(f"Etherscan API key không hợp lệ hoặc rate limit bị vượt quá. Chi tiết: {result}")
-                    elif 'rate limit' in str(result).lower():
-                        self.logger.warning(f"Rate limit reached. Waiting before next request.")
-                        await asyncio.sleep(1)  # Add delay to respect rate limits
-                        continue  # Try again
-                    elif 'Result window is too large' in error_msg:
-                        # This is a limitation of Etherscan - can't get beyond 10k records with pagination
-                        self.logger.warning(f"Reached Etherscan pagination limit (max 10,000 records). Using only first page data.")
-                        has_more_data = False  # Stop trying to get more pages
-                        break
-                    elif contract_address in str(result):
-                        raise Exception(f"Địa chỉ contract không hợp lệ hoặc không tồn tại: {result}")
-                    elif 'No transactions found' in str(result):
-                        # No more transactions for this contract
-                        self.logger.info(f"No more transactions found for this contract.")
-                        has_more_data = False
-                        break
-                    else:
-                        self.logger.warning(f"Etherscan API Error: {error_msg}. Details: {result}")
-                        has_more_data = False  # Stop on unknown errors
-                        break
-
-                # If we have no transactions or empty result, end the loop
-                if not data.get('result') or len(data['result']) == 0:
-                    self.logger.info(f"No transactions found in page {current_page} - ending pagination")
-                    has_more_data = False
-                    break
-
-                page_transactions = data['result']
-                total_in_page = len(page_transactions)
-                self.logger.info(f"Retrieved {total_in_page} transactions from page {current_page}")
-
-                # Only store token info once from the first transaction
-                if not hasattr(self, 'token_info') and total_in_page > 0:
-                    first_tx = page_transactions[0]
-                    self.token_info = {
-                        'symbol': first_tx.get('tokenSymbol', 'TOKEN'),
-                        'name': first_tx.get('tokenName', 'Unknown Token'),
-                        'decimals': first_tx.get('tokenDecimal', '18'),
-                        'divisor': 10 ** int(first_tx.get('tokenDecimal', '18'))
-                    }
-                    self.current_contract = contract_address
-
-                # Append this page's results to all_transactions
-                all_transactions.extend(page_transactions)
-
-                # Check if we need to continue pagination
-                if total_in_page < page_size:
-                    # We got fewer results than requested, so we've reached the end
-                    self.logger.info(f"Reached end of results: {total_in_page} < {page_size}")
-                    has_more_data = False
-                else:
-                    current_page += 1
-                    # Respect rate limit with a small delay between requests
-                    await asyncio.sleep(0.2)
-
-            except aiohttp.ClientError as e:
-                self.logger.error(f"Lỗi kết nối đến Etherscan API: {str(e)}")
-                raise Exception(f"Lỗi kết nối đến Etherscan API: {str(e)}")
-            except Exception as e:
-                self.logger.error(f"Lỗi khi lấy dữ liệu giao dịch ở page {current_page}: {str(e)}")
-                raise Exception(f"Lỗi khi lấy dữ liệu giao dịch: {str(e)}")
+        try:
+            first_page = await self._fetch_transactions_page(
+                contract_address, from_block, to_block, 1, page_size, sort_order, fields, errors)
+            all_transactions = list(first_page)
+
+            # Page 1 was full, so there may be more: keep a sliding window of PAGE_WINDOW pages
+            # in flight and consume them in order, cancelling whatever is still in flight at the end
+            if len(first_page) == page_size and last_page > 1:
+                self.logger.info(f"Fetching pages 2-{last_page}, {PAGE_WINDOW} at a time...")
+                pages = iter(range(2, last_page + 1))
+                tasks = deque()
+
+                def fill_window():
+                    for page in itertools.islice(pages, PAGE_WINDOW - len(tasks)):
+                        tasks.append(asyncio.create_task(self._fetch_transactions_page(
+                            contract_address, from_block, to_block, page, page_size, sort_order, fields, errors)))
+
+                fill_window()
+                try:
+                    while tasks:
+                        page_transactions = await tasks.popleft()
+                        all_transactions.extend(page_transactions)
+                        if len(page_transactions) < page_size:
+                            self.logger.info(f"Reached end of results: {len(page_transactions)} < {page_size}")
+                            break
+                        fill_window()
+                finally:
+                    for task in tasks:
+                        task.cancel()
+
+        except aiohttp.ClientError as e:
+            self.logger.error(f"Lỗi kết nối đến Etherscan API: {str(e)}")
+            raise Exception(f"Lỗi kết nối đến Etherscan API: {str(e)}")
+        except Exception as e:
+            self.logger.error(f"Lỗi khi lấy dữ liệu giao dịch: {str(e)}")
+            raise Exception(f"Lỗi khi lấy dữ liệu giao dịch: {str(e)}")
 
         # Log stats about all transactions retrieved
         total_transactions = len(all_transactions)
@@ -201,38 +287,181 @@ class EtherscanService:
 
         if total_transactions > 0:
             # Log sample timestamps to verify
-            self.logger.info(f"First transaction timestamp: {all_transactions[0]['timeStamp']} ({datetime.fromtimestamp(int(all_transactions[0]['timeStamp'])).isoformat()})")
+            self.logger.info(f"First transaction timestamp: {all_transactions[0]['timeStamp']} ({datetime.fromtimestamp(int(all_transactions[0]['timeStamp']), tz=timezone.utc).isoformat()})")
             if total_transactions > 2:
                 middle_idx = total_transactions // 2
-                self.logger.info(f"Sample transaction timestamp: {all_transactions[middle_idx]['timeStamp']} ({datetime.fromtimestamp(int(all_transactions[middle_idx]['timeStamp'])).isoformat()})")
-            self.logger.info(f"Last transaction timestamp: {all_transactions[-1]['timeStamp']} ({datetime.fromtimestamp(int(all_transactions[-1]['timeStamp'])).isoformat()})")
+                self.logger.info(f"Sample transaction timestamp: {all_transactions[middle_idx]['timeStamp']} ({datetime.fromtimestamp(int(all_transactions[middle_idx]['timeStamp']), tz=timezone.utc).isoformat()})")
+            self.logger.info(f"Last transaction timestamp: {all_transactions[-1]['timeStamp']} ({datetime.fromtimestamp(int(all_transactions[-1]['timeStamp']), tz=timezone.utc).isoformat()})")
 
         return all_transactions
 
+    async def _fetch_transactions_page(self, contract_address: str,
+                                       from_block: int, to_block: int,
+                                       page: int, page_size: int, sort_order: str,
+                                       fields: Optional[Tuple[str, ...]] = None,
+                                       errors: Optional[List[str]] = None) -> List[Dict]:
+        """
+        Fetch one page of token transfers from Etherscan
+
+        Only the requested fields of each transfer are kept, so the full decoded rows
+        are released as soon as the page is processed.
+
+        Returns:
+            Transactions of the page, empty when there are no (more) results
+        """
+        params = {
+            'module': 'account',
+            'action': 'tokentx',
+            'contractaddress': contract_address,
+            'startblock': str(from_block),
+            'endblock': str(to_block),
+            'page': str(page),
+            'offset': str(page_size),
+            'sort': sort_order,
+            'apikey': self.api_key
+        }
+
+        self.logger.info(f"Fetching page {page}...")
+        data = await self._get_json(params)
+
+        self.logger.info(f"Page {page} - Etherscan API response: Status={data.get('status')}, Message={data.get('message')}")
+
+        if data.get('status') == '1':
+            page_transactions = data.get('result') or []
+
+            # Seed the token info cache from the first transfer so get_token_info needs no request
+            if page == 1 and page_transactions:
+                await TOKEN_INFO_CACHE.setdefault(
+                    contract_address.lower(), self._token_info_from_tx(page_transactions[0], contract_address))
+
+            if fields:
+                page_transactions = [{field: tx[field] for field in fields} for tx in page_transactions]
+            self.logger.info(f"Retrieved {len(page_transactions)} transactions from page {page}")
+            return page_transactions
+
+        error_msg = data.get('message', 'Unknown error')
+        result = data.get('result', '')
+
+        if error_msg == 'NOTOK' and 'API Key' in result:
+            raise Exception(f"Etherscan API key không hợp lệ hoặc rate limit bị vượt quá. Chi tiết: {result}")
+        elif 'Result window is too large' in error_msg:
+            # This is a limitation of Etherscan - can't get beyond 10k records with pagination
+            self.logger.warning(f"Reached Etherscan pagination limit (max 10,000 records).")
+            return []
+        elif contract_address in str(result):
+            raise Exception(f"Địa chỉ contract không hợp lệ hoặc không tồn tại: {result}")
+        elif 'No transactions found' in str(result):
+            # No more transactions for this contract
+            self.logger.info(f"No more transactions found for this contract.")
+            return []
+        else:
+            self.logger.warning(f"Etherscan API Error: {error_msg}. Details: {result}")
+            if errors is not None:
+                errors.append(f"{error_msg}: {result}")
+            return []  # Stop on unknown errors
+
+    async def _get_transfer_logs(self, contract_address: str, from_block: int, to_block: int) -> List[Dict]:
+        """
+        Fetch the ERC-20 Transfer events of a contract with getLogs (oldest first)
+
+        Unlike tokentx, getLogs has no 10,000 record window, but it returns at most
+        LOGS_PAGE_SIZE logs per request: a full result is split at the middle block and
+        both halves are fetched again, until each range fits in one request.
+
+        Returns:
+            Transfers with the REPORT_TX_FIELDS of a tokentx row
+        """
+        logs = await self._fetch_logs_page(contract_address, from_block, to_block, 1)
+
+        if len(logs) >= LOGS_PAGE_SIZE:
+            if from_block < to_block:
+                middle = (from_block + to_block) // 2
+                halves = [
+                    asyncio.create_task(self._get_transfer_logs(contract_address, from_block, middle)),
+                    asyncio.create_task(self._get_transfer_logs(contract_address, middle + 1, to_block))
+                ]
+                try:
+                    lower, upper = await asyncio.gather(*halves)
+                except BaseException:
+                    for task in halves:
+                        task.cancel()
+                    raise
+                return lower + upper
+
+            # A single block with more logs than one request holds: page through it
+            page = 1
+            page_logs = logs
+            while len(page_logs) >= LOGS_PAGE_SIZE:
+                page += 1
+                page_logs = await self._fetch_logs_page(contract_address, from_block, to_block, page)
+                logs.extend(page_logs)
+
+        # ERC-721 transfers share topic0 but index the token id as a fourth topic
+        return [self._transfer_from_log(log) for log in logs if len(log['topics']) == 3]
+
+    async def _fetch_logs_page(self, contract_address: str, from_block: int, to_block: int,
+                               page: int) -> List[Dict]:
+        """Fetch one page of Transfer logs, empty when the range has none"""
+        params = {
+            'module': 'logs',
+            'action': 'getLogs',
+            'address': contract_address,
+            'fromBlock': str(from_block),
+            'toBlock': str(to_block),
+            'topic0': TRANSFER_TOPIC,
+            'page': str(page),
+            'offset': str(LOGS_PAGE_SIZE),
+            'apikey': self.api_key
+        }
+        data = await self._get_json(params)
+
+        if data.get('status') == '1':
+            return data.get('result') or []
+        if 'No records found' in str(data.get('message', '')):
+            return []
+        raise Exception(f"Etherscan getLogs error: {data.get('message')}. Details: {data.get('result')}")
+
+    @staticmethod
+    def _transfer_from_log(log: Dict) -> Dict:
+        """Decode a Transfer log into a tokentx-style row (decimal strings, lowercase addresses)"""
+        topics = log['topics']
+        return {
+            'blockNumber': str(int(log['blockNumber'], 16)),
+            'timeStamp': str(int(log['timeStamp'], 16)),
+            'from': '0x' + topics[1][-40:],
+            'to': '0x' + topics[2][-40:],
+            'value': str(int(log['data'][2:] or '0', 16))
+        }
+
     async def get_token_info(self, contract_address: str) -> Dict:
         """Get basic information about a token contract using free API endpoints"""
         # Log for debugging
         self.logger.info(f"Getting token info for contract: {contract_address}")
 
-        # Set default token info specific to this contract address
-        default_info = {
-            'symbol': 'TOKEN',
-            'name': f"Token {contract_address[:6]}...{contract_address[-4:]}",
-            'decimals': '18',
-            'divisor': 10 ** 18
+        # Served from TOKEN_INFO_CACHE (keyed by contract) after the first lookup or transfer fetch;
+        # no per-instance state, so concurrent reports can share this service
+        token_info = await self._fetch_token_info(contract_address)
+        if token_info is None:
+            # Default token info specific to this contract address
+            return self._token_info_from_tx({}, contract_address)
+
+        return token_info
+
+    @staticmethod
+    def _token_info_from_tx(tx: Dict, contract_address: str) -> Dict:
+        """Build the token info dict (with the int divisor precomputed) from a tokentx transfer"""
+        decimals = tx.get('tokenDecimal', '18')
+        return {
+            'symbol': tx.get('tokenSymbol', 'TOKEN'),
+            'name': tx.get('tokenName', f"Token {contract_address[:6]}...{contract_address[-4:]}"),
+            'decimals': decimals,
+            'divisor': 10 ** int(decimals)
         }
 
-        # Check if we already have token info from transactions
-        if hasattr(self, 'token_info'):
-            # Make sure the token_info is for the requested contract
-            # (The bug might be here if the token_info doesn't get reset between requests)
-            if getattr(self, 'current_contract', None) != contract_address:
-                # If token_info is from a different contract, reset it
-                if hasattr(self, 'current_contract'):
-                    delattr(self, 'token_info')
-            else:
-                return self.token_info
-
+    @cached(TOKEN_INFO_CACHE, key=lambda contract_address: contract_address.lower(),
+            unless=lambda token_info: token_info is None)
+    async def _fetch_token_info(self, contract_address: str) -> Optional[Dict]:
+        """Fetch token symbol/name/decimals from the latest transfer, None if unavailable"""
         try:
             # Thử phương pháp 1: Lấy thông tin từ giao dịch gần đây nhất
             # Không cần API Pro, sử dụng miễn phí
@@ -245,127 +474,254 @@ class EtherscanService:
                 'sort': 'desc',  # Lấy giao dịch mới nhất
                 'apikey': self.api_key
             }
-            async with aiohttp.ClientSession() as session:
-                async with session.get(self.api_url, params=params) as response:
-                    if response.status != 200:
-                        self.logger.warning(f"HTTP error khi lấy thông tin giao dịch: {response.status}")
-                        return default_info
-
-                    data = await response.json()
+            data = await self._get_json(params)
 
             if data.get('status') == '1' and data.get('result') and len(data['result']) > 0:
-                tx = data['result'][0]
-                token_info = {
-                    'symbol': tx.get('tokenSymbol', default_info['symbol']),
-                    'name': tx.get('tokenName', default_info['name']),
-                    'decimals': tx.get('tokenDecimal', default_info['decimals']),
-                    'divisor': 10 ** int(tx.get('tokenDecimal', default_info['decimals']))
-                }
-                # Save the token info and the contract it belongs to
-                self.token_info = token_info
-                self.current_contract = contract_address
-                return token_info
+                return self._token_info_from_tx(data['result'][0], contract_address)
             else:
                 self.logger.warning(f"Không tìm thấy giao dịch nào cho token {contract_address}")
-                return default_info
+                return None
 
         except Exception as e:
             self.logger.error(f"Lỗi khi lấy thông tin token: {str(e)}")
-            return default_info
+            return None
 
-    async def generate_campaign_report(self, contract_address: str,
-                                     pre_start_time: datetime, pre_end_time: datetime,
-                                     campaign_start_time: datetime, campaign_end_time: datetime,
-                                     max_pages: int = 10) -> Dict:
+    @staticmethod
+    def _decode_transactions(transactions: Iterable[Dict]
+                             ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, List[bytes]]:
         """
-        Generate a comprehensive report for a token campaign, comparing pre and during campaign metrics
+        Decode every field the report needs in a single pass over the transactions
+
+        Addresses are numbered in order of first appearance so the per-period and per-day
+        unique counts can run on integer arrays.
+
+        Returns:
+            (timestamps as int64, raw token amounts (smallest unit) as float64,
+             sender ids, recipient ids, 20-byte address of each id), arrays aligned with transactions
+        """
+        timestamps = []
+        values = []
+        senders = []
+        recipients = []
+        # Each distinct address gets one id and is decoded once
+        ids = {}
+        addresses = []
+        # Bound once: the loop body runs for every transaction
+        get_id = ids.get
+        add_timestamp = timestamps.append
+        add_value = values.append
+        add_sender = senders.append
+        add_recipient = recipients.append
+        for tx in transactions:
+            sender = tx['from']
+            recipient = tx['to']
+            add_timestamp(int(tx['timeStamp']))
+            # float() parses the raw amount directly (same rounding as float(int(...)), no big int)
+            add_value(float(tx['value']))
+            sender_id = get_id(sender)
+            if sender_id is None:
+                sender_id = ids[sender] = len(addresses)
+                addresses.append(address_bytes(sender))
+            recipient_id = get_id(recipient)
+            if recipient_id is None:
+                recipient_id = ids[recipient] = len(addresses)
+                addresses.append(address_bytes(recipient))
+            add_sender(sender_id)
+            add_recipient(recipient_id)
+        return (np.array(timestamps, dtype=np.int64),
+                np.array(values, dtype=np.float64),
+                np.array(senders, dtype=np.int64),
+                np.array(recipients, dtype=np.int64),
+                addresses)
+
+    @staticmethod
+    def _historical_window_blocks(pre_start_block: int, pre_end_block: int, pre_tx_count: int) -> int:
+        """
+        Size the historical holders window from the pre-campaign transaction density
+
+        Busy tokens get a window holding about 80% of Etherscan's 10k record limit
+        instead of 1M blocks whose oldest pages say little about recent holders.
+        """
+        blocks_per_tx = max(1, pre_end_block - pre_start_block) / max(1, pre_tx_count)
+        return max(1, min(HISTORICAL_WINDOW_BLOCKS, int(PAGINATION_WINDOW * blocks_per_tx * 0.8)))
+
+    async def _get_historical_holders(self, contract_address: str, pre_start_block: int,
+                                      db_service: Optional[DBService] = None,
+                                      window_blocks: int = HISTORICAL_WINDOW_BLOCKS,
+                                      window_final: bool = True) -> Tuple[Set[bytes], bool]:
+        """
+        Sample the holders that existed before the pre-campaign period
 
         Args:
             contract_address: Token contract address
-            pre_start_time: Pre-campaign period start time
-            pre_end_time: Pre-campaign period end time
-            campaign_start_time: Campaign period start time
-            campaign_end_time: Campaign period end time
-            max_pages: Maximum number of pages to fetch per period
+            pre_start_block: First block of the pre-campaign period (0 if its lookup failed)
+            db_service: Optional DBService used to cache the result
+            window_blocks: Number of blocks before pre_start_block to sample
+            window_final: Whether the blocks before pre_start_block can no longer change
 
         Returns:
-            Complete campaign report with metrics and daily data
+            (recipient addresses seen in up to 3 pages of the window before pre_start_block,
+             whether the sample was fetched without errors); the sample is only cached in
+             MongoDB when it is complete and its window final
         """
-        self.logger.info(f"Generating campaign report for token: {contract_address}")
-        self.logger.info(f"Pre-campaign period: {pre_start_time.isoformat()} to {pre_end_time.isoformat()}")
-        self.logger.info(f"Campaign period: {campaign_start_time.isoformat()} to {campaign_end_time.isoformat()}")
+        holders_before_pre = set()
 
-        # Reset any existing token_info to prevent using data from previous requests
-        if hasattr(self, 'token_info'):
-            delattr(self, 'token_info')
-        if hasattr(self, 'current_contract'):
-            delattr(self, 'current_contract')
+        # Without the pre-campaign start block there is no window to sample
+        if pre_start_block <= 0:
+            self.logger.warning("Pre-campaign start block unknown, skipping historical holders")
+            return holders_before_pre, False
 
-        # Get token info first
-        token_info = await self.get_token_info(contract_address)
-        token_symbol = token_info.get('symbol', 'TOKEN')
-        token_decimals = int(token_info.get('decimals', '18'))
-        token_divisor = 10 ** token_decimals
+        # Get some historical transactions (if available) to establish earlier holders
+        try:
+            # Try to get a historical baseline for holders that existed before pre-campaign
+            historical_end_block = pre_start_block - 1
+            historical_start_block = max(1, historical_end_block - window_blocks)
 
-        # Convert timestamps to block numbers
-        pre_start_block = await self.get_block_by_timestamp(int(pre_start_time.timestamp()))
-        pre_end_block = await self.get_block_by_timestamp(int(pre_end_time.timestamp()))
-        campaign_start_block = await self.get_block_by_timestamp(int(campaign_start_time.timestamp()))
-        campaign_end_block = await self.get_block_by_timestamp(int(campaign_end_time.timestamp()))
+            # The range is in the past, so its holders never change: reuse them from MongoDB if cached
+            cached_holders = None
+            if db_service is not None:
+                cached_holders = await db_service.get_historical_holders(
+                    contract_address, historical_start_block, historical_end_block)
 
-        self.logger.info(f"Pre-campaign blocks: {pre_start_block} to {pre_end_block}")
-        self.logger.info(f"Campaign blocks: {campaign_start_block} to {campaign_end_block}")
+            if cached_holders is not None:
+                holders_before_pre = set(cached_holders)
+                self.logger.info(f"Historical holders loaded from cache: {len(holders_before_pre)}")
+            else:
+                # Error pages end the results early: such a sample is used but never cached
+                errors = []
+                historical_txs = await self.get_token_transactions_by_blocks(
+                    contract_address,
+                    historical_start_block,
+                    historical_end_block,
+                    max_pages=3,  # Just get a sample
+                    sort_order="asc",
+                    fields=('timeStamp', 'to'),
+                    errors=errors
+                )
+
+                # Collect the distinct recipients in one set.update, then decode each address once
+                recipients = set()
+                recipients.update(tx['to'] for tx in historical_txs)
+                holders_before_pre = set(map(address_bytes, recipients))
+
+                self.logger.info(f"Historical holders found: {len(holders_before_pre)}")
+
+                if errors:
+                    self.logger.warning(f"Historical holders sample incomplete: {errors[0]}")
+                    return holders_before_pre, False
+
+                if db_service is not None and window_final:
+                    await db_service.store_historical_holders(
+                        contract_address, historical_start_block, historical_end_block,
+                        list(holders_before_pre))
+        except Exception as e:
+            self.logger.warning(f"Unable to fetch historical holders: {str(e)}")
+            return holders_before_pre, False
 
-        # Get transactions for pre-campaign period (oldest first for holder analysis)
-        pre_transactions = await self.get_token_transactions_by_blocks(
-            contract_address,
-            pre_start_block,
-            pre_end_block,
-            max_pages=max_pages,
-            sort_order="asc"  # Oldest first for accurate holder tracking
-        )
+        return holders_before_pre, True
 
-        # Get transactions for campaign period
-        campaign_transactions = await self.get_token_transactions_by_blocks(
-            contract_address,
-            campaign_start_block,
-            campaign_end_block,
-            max_pages=max_pages,
-            sort_order="asc"  # Oldest first for consistent analysis
-        )
+    def _start_period_fetches(self, contract_address: str,
+                              pre_start_block: int, pre_end_block: int,
+                              campaign_start_block: int, campaign_end_block: int,
+                              max_pages: int,
+                              errors: Optional[List[str]] = None) -> Tuple[asyncio.Task, asyncio.Task]:
+        """
+        Start the pre-campaign and campaign transaction fetches (oldest first)
 
-        self.logger.info(f"Pre-campaign transactions: {len(pre_transactions)}")
-        self.logger.info(f"Campaign transactions: {len(campaign_transactions)}")
+        When the campaign directly follows the pre-campaign period, both are read with one
+        paginated request over the combined block range and split in memory. A period the
+        combined read did not cover completely (10k record window) is fetched on its own.
+        With max_pages=0 a range past the 10k window is read from the Transfer logs instead.
+        Pages that failed and ended a read early are collected in errors (if given).
 
-        # ----- Calculate metrics -----
+        Returns:
+            (pre-campaign task, campaign task)
+        """
+        async def fetch(from_block: int, to_block: int) -> List[Dict]:
+            transactions = await self.get_token_transactions_by_blocks(
+                contract_address, from_block, to_block, max_pages=max_pages, sort_order="asc",
+                fields=REPORT_TX_FIELDS, errors=errors)
+            if not max_pages and len(transactions) >= PAGINATION_WINDOW:
+                # Unlimited pages but tokentx stopped at its 10k window: read the whole range
+                # from the Transfer logs instead, which have no such window
+                self.logger.info(f"tokentx window reached, reading blocks {from_block} to {to_block} from Transfer logs")
+                del transactions
+                return await self._get_transfer_logs(contract_address, from_block, to_block)
+            return transactions
+
+        contiguous = (pre_start_block <= campaign_start_block
+                      and pre_end_block <= campaign_end_block
+                      and campaign_start_block - pre_end_block <= COMBINED_FETCH_MAX_GAP_BLOCKS)
+        if not contiguous:
+            return (asyncio.create_task(fetch(pre_start_block, pre_end_block)),
+                    asyncio.create_task(fetch(campaign_start_block, campaign_end_block)))
+
+        combined_task = asyncio.create_task(fetch(pre_start_block, campaign_end_block))
+        # Most records one paginated read can return (see get_token_transactions_by_blocks);
+        # without a page limit fetch() falls back to the Transfer logs and is never truncated
+        record_limit = min(PAGINATION_WINDOW, max_pages * 1000) if max_pages else math.inf
+
+        async def period(from_block: int, to_block: int) -> List[Dict]:
+            combined = await combined_task
+            covered_to = campaign_end_block
+            if len(combined) >= record_limit:
+                # Truncated: only blocks before the last returned one are known to be complete
+                covered_to = int(combined[-1]['blockNumber']) - 1
+            if to_block <= covered_to:
+                # Rows are in ascending block order: bisect the period's bounds instead of
+                # parsing every row's blockNumber
+                block_number = lambda tx: int(tx['blockNumber'])
+                start = bisect.bisect_left(combined, from_block, key=block_number)
+                end = bisect.bisect_right(combined, to_block, lo=start, key=block_number)
+                return combined[start:end]
+            return await fetch(from_block, to_block)
+
+        self.logger.info(f"Fetching blocks {pre_start_block} to {campaign_end_block} in one paginated read")
+        return (asyncio.create_task(period(pre_start_block, pre_end_block)),
+                asyncio.create_task(period(campaign_start_block, campaign_end_block)))
+
+    @staticmethod
+    def _calculate_metrics(pre_transactions: List[Dict], campaign_transactions: List[Dict],
+                           holders_before_pre: Set[bytes], token_divisor: int) -> Dict:
+        """
+        Compute the report's period totals and daily series from the fetched transfers
 
-        # 1. Active wallets (unique addresses participating in transactions)
-        pre_wallets = set()
-        for tx in pre_transactions:
-            pre_wallets.add(tx['from'])
-            pre_wallets.add(tx['to'])
+        Runs without touching the event loop, so it can be called from a worker thread.
+        The transaction lists are emptied once decoded.
 
-        campaign_wallets = set()
-        for tx in campaign_transactions:
-            campaign_wallets.add(tx['from'])
-            campaign_wallets.add(tx['to'])
+        Returns:
+            Metric values and daily series keyed by name (new holders as counts)
+        """
+        # Combine pre and campaign transactions for full timeline analysis, decoding their
+        # fields once for both the totals and the daily series (chained, not copied into a new list)
+        timestamps, values, senders, recipients, addresses = EtherscanService._decode_transactions(
+            itertools.chain(pre_transactions, campaign_transactions))
+        pre_count = len(pre_transactions)
+        campaign_count = len(campaign_transactions)
+
+        # Everything below works on the decoded columns: empty the lists so the transaction
+        # dicts are freed before the aggregation allocates its arrays
+        pre_transactions.clear()
+        campaign_transactions.clear()
+
+        # Addresses of this report that already held the token before the pre-campaign period,
+        # matched as one batch of fixed-width 20-byte strings
+        known_holders = np.isin(np.array(addresses, dtype='S20'),
+                                np.array(list(holders_before_pre), dtype='S20'))
 
-        active_wallets_pre = len(pre_wallets)
-        active_wallets_campaign = len(campaign_wallets)
+        # 1. Active wallets (unique addresses participating in transactions)
+        active_wallets_pre = len(np.union1d(senders[:pre_count], recipients[:pre_count]))
+        active_wallets_campaign = len(np.union1d(senders[pre_count:], recipients[pre_count:]))
 
         # Calculate change percentage
         active_wallets_change = 0
         if active_wallets_pre > 0:
             active_wallets_change = round((active_wallets_campaign - active_wallets_pre) / active_wallets_pre * 100, 1)
 
-        # 2. Transaction volume
-        pre_volume = 0
-        for tx in pre_transactions:
-            pre_volume += int(tx['value']) / token_divisor
-
-        campaign_volume = 0
-        for tx in campaign_transactions:
-            campaign_volume += int(tx['value']) / token_divisor
+        # 2. Transaction volume (vectorized sum per period of the raw amounts,
+        # converted to token units with one division per total)
+        pre_volume = float(values[:pre_count].sum()) / token_divisor
+        campaign_volume = float(values[pre_count:].sum()) / token_divisor
 
         # Calculate change percentage
         volume_change = 0
@@ -373,44 +729,21 @@ class EtherscanService:
             volume_change = round((campaign_volume - pre_volume) / pre_volume * 100, 1)
 
         # 3. New token holders
-        # Find all holders before the pre-campaign period to establish baseline
-        holders_before_pre = set()
+        # holders_before_pre (baseline of holders before the pre-campaign period) was fetched above
 
-        # Get some historical transactions (if available) to establish earlier holders
-        try:
-            # Try to get a historical baseline for holders that existed before pre-campaign
-            historical_end_block = pre_start_block - 1
-            historical_start_block = max(1, historical_end_block - 1000000)  # Try 1M blocks before
-
-            historical_txs = await self.get_token_transactions_by_blocks(
-                contract_address,
-                historical_start_block,
-                historical_end_block,
-                max_pages=3,  # Just get a sample
-                sort_order="asc"
-            )
-
-            for tx in historical_txs:
-                holders_before_pre.add(tx['to'])
-
-            self.logger.info(f"Historical holders found: {len(holders_before_pre)}")
-        except Exception as e:
-            self.logger.warning(f"Unable to fetch historical holders: {str(e)}")
+        # Each address is checked once: it is a new holder if it did not hold the token before
+        # the pre-campaign period, and it belongs to the period of the first row it received in
+        # (so a pre-campaign holder is never counted again during the campaign)
+        first_row = np.full(len(addresses), len(recipients), dtype=np.int64)
+        np.minimum.at(first_row, recipients, np.arange(len(recipients)))
+        new_holders = np.flatnonzero((first_row < len(recipients)) & ~known_holders)
+        in_pre = first_row[new_holders] < pre_count
 
         # New holders during pre-campaign
-        new_holders_pre = set()
-        for tx in pre_transactions:
-            if tx['to'] not in holders_before_pre and tx['to'] not in new_holders_pre:
-                new_holders_pre.add(tx['to'])
-
-        # Add pre-campaign holders to the known holders set
-        holders_before_campaign = holders_before_pre.union(new_holders_pre)
+        new_holders_pre = new_holders[in_pre]
 
         # New holders during campaign
-        new_holders_campaign = set()
-        for tx in campaign_transactions:
-            if tx['to'] not in holders_before_campaign and tx['to'] not in new_holders_campaign:
-                new_holders_campaign.add(tx['to'])
+        new_holders_campaign = new_holders[~in_pre]
 
         # Calculate change percentage
         new_holders_change = 0
@@ -419,79 +752,180 @@ class EtherscanService:
 
         # ----- Calculate daily metrics -----
 
-        # Combine pre and campaign transactions for full timeline analysis
-        all_transactions = pre_transactions + campaign_transactions
+        # Transactions are bucketed by UTC day (integer division, no datetime per row) and
+        # aggregated in their fetched order: only the day buckets need to be in order, so the
+        # transactions themselves are never sorted
+        days = []
+        day_labels = []
+        daily_volume = []
+        daily_active_wallets = []
+        daily_new_holders = np.zeros(0, dtype=np.int64)
+        if len(timestamps):
+            first_day = int(timestamps.min()) // SECONDS_PER_DAY
+            tx_day_offsets = timestamps // SECONDS_PER_DAY - first_day
+            # Days with at least one transaction, ascending, and the position of each day in that list
+            has_transactions = np.bincount(tx_day_offsets) > 0
+            days = (np.flatnonzero(has_transactions) + first_day).tolist()
+            day_positions = np.cumsum(has_transactions) - 1
+            day_index = day_positions[tx_day_offsets]
+
+            # ISO date string built once per day, not once per transaction
+            # (plain date arithmetic from the day bucket, no datetime or timezone lookup)
+            day_labels = [(EPOCH_DATE + timedelta(days=day)).isoformat() for day in days]
+
+            # Daily transaction volume: weighted count per day, divided once per day
+            daily_volume = (np.bincount(day_index, weights=values, minlength=len(days)) / token_divisor).tolist()
+
+            # Daily active wallets: unique (day, address id) pairs counted per day
+            day_addresses = np.unique(np.concatenate((day_index * len(addresses) + senders,
+                                                      day_index * len(addresses) + recipients)))
+            daily_active_wallets = np.bincount(day_addresses // len(addresses), minlength=len(days)).tolist()
+
+            # Daily new holders: an address becomes a holder on the day it first receives tokens,
+            # unless it already held them before the pre-campaign period
+            first_received = np.full(len(addresses), np.iinfo(np.int64).max, dtype=np.int64)
+            np.minimum.at(first_received, recipients, timestamps)
+            new_holder_days = day_positions[first_received[new_holders] // SECONDS_PER_DAY - first_day]
+            daily_new_holders = np.bincount(new_holder_days, minlength=len(days))
 
-        # Sort by timestamp to ensure chronological processing
-        all_transactions.sort(key=lambda tx: int(tx['timeStamp']))
-
-        # Daily active wallets
-        daily_active_wallets = defaultdict(set)
-
-        # Daily transaction volume
-        daily_volume = defaultdict(float)
+        # Convert daily data to sorted list format for response
+        daily_active_wallets_list = [
+            {"date": label, "count": count}
+            for label, count in zip(day_labels, daily_active_wallets)
+        ]
 
-        # Daily new holders
-        daily_new_holders = defaultdict(set)
+        daily_volume_list = [
+            {"date": label, "volume": volume}
+            for label, volume in zip(day_labels, daily_volume)
+        ]
 
-        # All known holders (including historical)
-        all_known_holders = holders_before_pre.copy()
+        daily_new_holders_list = [
+            {"date": label, "count": count}
+            for label, count in zip(day_labels, daily_new_holders.tolist()) if count
+        ]
 
-        # Daily cumulative holders count
-        daily_cumulative_holders = defaultdict(int)
+        # Known holders only grow by each day's new holders: a running count per day
+        cumulative_counts = (len(holders_before_pre) + np.cumsum(daily_new_holders)).tolist()
+        cumulative_holders_list = [
+            {"date": label, "count": count}
+            for label, count in zip(day_labels, cumulative_counts)
+        ]
 
-        # Process transactions day by day
-        for tx in all_transactions:
-            # Convert timestamp to date
-            tx_timestamp = int(tx['timeStamp'])
-            tx_date = datetime.fromtimestamp(tx_timestamp).date().isoformat()
+        return {
+            "active_wallets_pre": active_wallets_pre,
+            "active_wallets_campaign": active_wallets_campaign,
+            "active_wallets_change": active_wallets_change,
+            "pre_volume": pre_volume,
+            "campaign_volume": campaign_volume,
+            "volume_change": volume_change,
+            "new_holders_pre": len(new_holders_pre),
+            "new_holders_campaign": len(new_holders_campaign),
+            "new_holders_change": new_holders_change,
+            "daily_active_wallets_list": daily_active_wallets_list,
+            "daily_volume_list": daily_volume_list,
+            "daily_new_holders_list": daily_new_holders_list,
+            "cumulative_holders_list": cumulative_holders_list,
+            "pre_count": pre_count,
+            "campaign_count": campaign_count
+        }
 
-            # Add addresses to daily active wallets
-            daily_active_wallets[tx_date].add(tx['from'])
-            daily_active_wallets[tx_date].add(tx['to'])
+    async def generate_campaign_report(self, contract_address: str,
+                                     pre_start_time: datetime, pre_end_time: datetime,
+                                     campaign_start_time: datetime, campaign_end_time: datetime,
+                                     max_pages: int = 10,
+                                     db_service: Optional[DBService] = None) -> Dict:
+        """
+        Generate a comprehensive report for a token campaign, comparing pre and during campaign metrics
 
-            # Add value to daily volume
-            daily_volume[tx_date] += int(tx['value']) / token_divisor
+        Args:
+            contract_address: Token contract address
+            pre_start_time: Pre-campaign period start time
+            pre_end_time: Pre-campaign period end time
+            campaign_start_time: Campaign period start time
+            campaign_end_time: Campaign period end time
+            max_pages: Maximum number of pages to fetch per period
+            db_service: Optional DBService used to cache historical holders between reports
 
-            # Check for new holders
-            if tx['to'] not in all_known_holders:
-                daily_new_holders[tx_date].add(tx['to'])
-                all_known_holders.add(tx['to'])
+        Returns:
+            Complete campaign report with metrics and daily data
+        """
+        self.logger.info(f"Generating campaign report for token: {contract_address}")
+        self.logger.info(f"Pre-campaign period: {pre_start_time.isoformat()} to {pre_end_time.isoformat()}")
+        self.logger.info(f"Campaign period: {campaign_start_time.isoformat()} to {campaign_end_time.isoformat()}")
 
-            # Update cumulative holders for this day and all subsequent days
-            daily_cumulative_holders[tx_date] = len(all_known_holders)
+        # Token info and the four timestamp -> block lookups are independent: run them together
+        token_info, pre_start_block, pre_end_block, campaign_start_block, campaign_end_block = await asyncio.gather(
+            self._fetch_token_info(contract_address),
+            self.get_block_by_timestamp(int(pre_start_time.timestamp())),
+            self.get_block_by_timestamp(int(pre_end_time.timestamp())),
+            self.get_block_by_timestamp(int(campaign_start_time.timestamp())),
+            self.get_block_by_timestamp(int(campaign_end_time.timestamp()))
+        )
+        # Token info is defaulted when the lookup failed (see get_token_info)
+        token_info_found = token_info is not None
+        if not token_info_found:
+            token_info = self._token_info_from_tx({}, contract_address)
+        token_symbol = token_info['symbol']
+        # Token info always carries the divisor precomputed as an int
+        token_divisor = token_info['divisor']
 
-        # Convert daily data to sorted list format for response
-        daily_active_wallets_list = [
-            {"date": date, "count": len(addresses)}
-            for date, addresses in sorted(daily_active_wallets.items())
-        ]
+        self.logger.info(f"Pre-campaign blocks: {pre_start_block} to {pre_end_block}")
+        self.logger.info(f"Campaign blocks: {campaign_start_block} to {campaign_end_block}")
 
-        daily_volume_list = [
-            {"date": date, "volume": volume}
-            for date, volume in sorted(daily_volume.items())
+        # Pre-campaign, campaign and historical holder fetches share no data: run them together
+        # (both periods oldest first for accurate holder tracking)
+        period_errors = []
+        pre_task, campaign_task = self._start_period_fetches(
+            contract_address, pre_start_block, pre_end_block,
+            campaign_start_block, campaign_end_block, max_pages, period_errors)
+
+        async def historical_holders() -> Tuple[Set[bytes], bool]:
+            # Size the historical window from the pre-campaign density once it is known
+            window_blocks = self._historical_window_blocks(
+                pre_start_block, pre_end_block, len(await pre_task))
+            # Blocks before the pre-campaign start are final once that start is old enough
+            window_final = pre_start_time.timestamp() < time.time() - BLOCK_FINALITY_SECONDS
+            return await self._get_historical_holders(
+                contract_address, pre_start_block, db_service, window_blocks, window_final)
+
+        fetch_tasks = [
+            pre_task,
+            campaign_task,
+            # Baseline of holders before the pre-campaign period (never raises on its own)
+            asyncio.create_task(historical_holders())
         ]
+        try:
+            pre_transactions, campaign_transactions, (holders_before_pre, holders_complete) = await asyncio.gather(
+                *fetch_tasks)
+        except BaseException:
+            # The report cannot be built without both periods: stop the other fetches too
+            for task in fetch_tasks:
+                task.cancel()
+            raise
 
-        daily_new_holders_list = [
-            {"date": date, "count": len(holders)}
-            for date, holders in sorted(daily_new_holders.items())
-        ]
+        self.logger.info(f"Pre-campaign transactions: {len(pre_transactions)}")
+        self.logger.info(f"Campaign transactions: {len(campaign_transactions)}")
 
-        # For cumulative holders, ensure all dates are filled
-        all_dates = sorted(set(
-            list(daily_active_wallets.keys()) +
-            list(daily_volume.keys()) +
-            list(daily_new_holders.keys())
-        ))
+        # A report is final (reusable, see DBService.get_final_campaign_report) only if both periods
+        # are over and no input was degraded: every block lookup succeeded (0 means failed and the
+        # range was widened), token info was found rather than defaulted, and no page or
+        # historical holder fetch ended early on an Etherscan error
+        final = (all((pre_start_block, pre_end_block, campaign_start_block, campaign_end_block))
+                 and token_info_found
+                 and not period_errors
+                 and holders_complete
+                 and max(pre_end_time.timestamp(), campaign_end_time.timestamp())
+                 < time.time() - BLOCK_FINALITY_SECONDS)
+        if period_errors:
+            self.logger.warning(f"Campaign report built from incomplete pages: {period_errors[0]}")
 
-        # Fill in any missing dates with the previous cumulative count
-        cumulative_count = 0
-        cumulative_holders_list = []
+        # ----- Calculate metrics -----
 
-        for date in all_dates:
-            if date in daily_cumulative_holders:
-                cumulative_count = daily_cumulative_holders[date]
-            cumulative_holders_list.append({"date": date, "count": cumulative_count})
+        # The CPU-bound decoding and aggregation run in a worker thread so the event loop keeps
+        # serving other requests meanwhile (NumPy releases the GIL for the array work).
+        del fetch_tasks, pre_task, campaign_task, historical_holders
+        metrics = await asyncio.to_thread(
+            self._calculate_metrics, pre_transactions, campaign_transactions, holders_before_pre, token_divisor)
 
         # ----- Prepare response -----
 
@@ -527,39 +961,40 @@ class EtherscanService:
                 "metrics": [
                     {
                         "name": "Active Wallets",
-                        "preCampaign": active_wallets_pre,
-                        "duringCampaign": active_wallets_campaign,
-                        "changePercent": active_wallets_change,
+                        "preCampaign": metrics["active_wallets_pre"],
+                        "duringCampaign": metrics["active_wallets_campaign"],
+                        "changePercent": metrics["active_wallets_change"],
                         "description": "Số địa chỉ ví duy nhất đã tương tác với hợp đồng"
                     },
                     {
                         "name": f"Transaction Volume ({token_symbol})",
-                        "preCampaign": pre_volume,
-                        "duringCampaign": campaign_volume,
-                        "changePercent": volume_change,
+                        "preCampaign": metrics["pre_volume"],
+                        "duringCampaign": metrics["campaign_volume"],
+                        "changePercent": metrics["volume_change"],
                         "description": "Tổng lượng token đã chuyển qua contract"
                     },
                     {
                         "name": "New Token Holders",
-                        "preCampaign": len(new_holders_pre),
-                        "duringCampaign": len(new_holders_campaign),
-                        "changePercent": new_holders_change,
+                        "preCampaign": metrics["new_holders_pre"],
+                        "duringCampaign": metrics["new_holders_campaign"],
+                        "changePercent": metrics["new_holders_change"],
                         "description": "Số địa chỉ lần đầu tiên nắm giữ token"
                     }
                 ]
             },
             "dailyData": {
-                "activeWallets": daily_active_wallets_list,
-                "transactionVolume": daily_volume_list,
-                "newHolders": daily_new_holders_list,
-                "cumulativeHolders": cumulative_holders_list
+                "activeWallets": metrics["daily_active_wallets_list"],
+                "transactionVolume": metrics["daily_volume_list"],
+                "newHolders": metrics["daily_new_holders_list"],
+                "cumulativeHolders": metrics["cumulative_holders_list"]
             },
             "dataCollection": {
                 "maxPages": max_pages,
+                "final": bool(final),
                 "transactionsAnalyzed": {
-                    "preCampaign": len(pre_transactions),
-                    "duringCampaign": len(campaign_transactions),
-                    "total": len(all_transactions)
+                    "preCampaign": metrics["pre_count"],
+                    "duringCampaign": metrics["campaign_count"],
+                    "total": metrics["pre_count"] + metrics["campaign_count"]
                 }
             },
             "lastUpdated": datetime.now().isoformat()
@@ -0,0 +1,19 @@
+import re
+
+from app import ojson
+
+# Địa chỉ Ethereum hợp lệ: 0x + 40 ký tự hex
+_ADDR = re.compile(r"^0x[0-9a-fA-F]{40}$").fullmatch
+
+
+def valid_addr(s: str) -> bool:
+    """Check that s is a 0x-prefixed, 40 hex digit Ethereum address"""
+    return bool(_ADDR(s))
+
+
+def invalid_address_response(address: str):
+    """400 response for a malformed Ethereum address"""
+    return ojson({
+        "success": False,
+        "message": f"Invalid Ethereum address format: {address}. Address must be in format 0x... followed by 40 hex characters."
+    }, status=400)
@@ -2,12 +2,17 @@ import os
 import sys
 from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+# Load environment variables (SKIP_DOTENV=1 khi môi trường đã được cấu hình sẵn, vd. container)
+if os.getenv("SKIP_DOTENV") != "1":
+    load_dotenv()
 
 # Etherscan API configuration
 ETHERSCAN_API_KEY = os.getenv("ETHERSCAN_API_KEY")
 ETHERSCAN_API_URL = os.getenv("ETHERSCAN_API_URL", "https://api.etherscan.io/api")
+ETHERSCAN_CHAIN_ID = int(os.getenv("ETHERSCAN_CHAIN_ID", "1"))  # Ethereum mainnet
+ETHERSCAN_MAX_CONCURRENCY = int(os.getenv("ETHERSCAN_MAX_CONCURRENCY", "5"))  # Free tier: ~5 req/s
+ETHERSCAN_RATE_LIMIT = float(os.getenv("ETHERSCAN_RATE_LIMIT", "5"))  # Request/giây tối đa của API key (chia đều cho SERVER_WORKERS)
+TOKEN_INFO_CACHE_TTL = int(os.getenv("TOKEN_INFO_CACHE_TTL", "0"))  # Giây, 0 = không hết hạn (metadata ERC-20 không đổi)
 
 # Kiểm tra và hiển thị cảnh báo nếu không có API key
 if not ETHERSCAN_API_KEY:
@@ -26,6 +31,7 @@ MONGO_DB = os.getenv("MONGO_DB", "blockchain_metrics")
 SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
 SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))  # Mặc định port 8002
 DEBUG = os.getenv("DEBUG", "True").lower() == "true"  # Mặc định bật debug mode
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", str(os.cpu_count() or 1)))  # Mỗi worker có event loop + MongoDB client riêng
 
 # Ethereum node (optional)
 ETHEREUM_RPC_URL = os.getenv("ETHEREUM_RPC_URL", "")